@@ -3,6 +3,7 @@ Discord bot handlers for Goated Wager Bot.
 Shares the same backend as the Telegram bot.
 """
 
+import aiohttp
 import discord
 from discord.ext import commands
 import logging
@@ -36,6 +37,18 @@ class GoatedWagerDiscordBot(commands.Bot):
         )
         
         self.milestone_tracker = MilestoneTracker()
+
+    async def login(self, token: str) -> None:
+        """Give discord.py's HTTP session a keep-alive connector before it is created."""
+        # Built here rather than in __init__ because the connector binds to the running loop
+        self.http.connector = aiohttp.TCPConnector(
+            # No connection cap, matching discord.py's default connector
+            limit=0,
+            ttl_dns_cache=600,
+            keepalive_timeout=75,
+            enable_cleanup_closed=True,
+        )
+        await super().login(token)
     
     async def on_ready(self):
         """Called when the bot is ready."""
@@ -2,8 +2,9 @@
 Telegram bot command handlers for the Goated Wager Tracker Bot.
 """
 
+import heapq
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
@@ -13,9 +14,9 @@ from database.connection import (
     get_user, create_user, update_user,
     get_cached_wager_data, cache_wager_data,
     get_cached_leaderboard_data, cache_leaderboard_data,
-    log_command_usage, get_all_active_users, get_user_count,
+    log_command_usage, iter_active_users, get_user_count,
     get_weekly_leaderboard_snapshots, get_weekly_leaderboard_snapshot,
-    get_pending_milestone_requests, update_milestone_request_status,
+    get_pending_milestone_requests,
     unregister_user, get_user_data_summary
 )
 from utils.milestone_tracker import milestone_tracker
@@ -347,15 +348,27 @@ async def list_users(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
 
     try:
       
-        users = await get_all_active_users()
         user_count = await get_user_count()
+        max_users_per_message = 20
+
+        # Stream users: keep just enough for the short listing, plus the ten
+        # most recent registrations for the summary view
+        users = []
+        recent_heap = []
+        seq = 0
+        async for user_data in iter_active_users():
+            if len(users) <= max_users_per_message:
+                users.append(user_data)
+            seq += 1
+            entry = (user_data.get('created_at') or '', -seq, user_data)
+            if len(recent_heap) < 10:
+                heapq.heappush(recent_heap, entry)
+            else:
+                heapq.heappushpop(recent_heap, entry)
 
         if not users:
             message = "📋 **Registered Users**\n\nNo users are currently registered."
         else:
-            
-            max_users_per_message = 20
-
             if len(users) <= max_users_per_message:
              
                 user_list = []
@@ -390,12 +403,12 @@ async def list_users(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
                 message = f"""📋 **Registered Users Summary**
 
 **Total Users:** {user_count}
-**Active Users:** {len(users)}
+**Active Users:** {user_count}
 
 **Recent Registrations:**"""
 
                 
-                recent_users = sorted(users, key=lambda x: x.get('created_at', ''), reverse=True)[:10]
+                recent_users = [entry[2] for entry in sorted(recent_heap, reverse=True)]
                 for i, user_data in enumerate(recent_users, 1):
                     goated_username = user_data.get('goated_username', 'N/A')
                     telegram_username = user_data.get('telegram_username', 'N/A')
@@ -406,8 +419,8 @@ async def list_users(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
 
                     message += f"\n{i}. **{safe_goated_username}** (@{safe_telegram_username})"
 
-                if len(users) > 10:
-                    message += f"\n\n*... and {len(users) - 10} more users*"
+                if user_count > 10:
+                    message += f"\n\n*... and {user_count - 10} more users*"
 
                 message += "\n\n*Use the management script for full user list*"
 
@@ -437,19 +450,24 @@ async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 
     try:
         
-        users = await get_all_active_users()
-        user_count = len(users)
+        user_count = await get_user_count()
 
-        
-        from datetime import timedelta
         today = datetime.now().date()
         week_ago = today - timedelta(days=7)
         month_ago = today - timedelta(days=30)
 
         recent_week = 0
         recent_month = 0
+        recent_wager_checks = 0
+        recent_leaderboard_checks = 0
+
+        # Single streaming pass over users for every counter
+        async for user_data in iter_active_users():
+            if user_data.get('last_wager_check'):
+                recent_wager_checks += 1
+            if user_data.get('last_leaderboard_check'):
+                recent_leaderboard_checks += 1
 
-        for user_data in users:
             created_at = user_data.get('created_at', '')
             try:
                 if created_at:
@@ -461,10 +479,6 @@ async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
             except:
                 continue
 
-        
-        recent_wager_checks = sum(1 for u in users if u.get('last_wager_check'))
-        recent_leaderboard_checks = sum(1 for u in users if u.get('last_leaderboard_check'))
-
         message = f"""📊 **Bot Statistics**
 
 **👥 Users:**
@@ -588,10 +602,8 @@ async def capture_leaderboard(update: Update, context: ContextTypes.DEFAULT_TYPE
         return
 
     try:
-        # Import here to avoid circular imports
-        from utils.weekly_leaderboard_scheduler import WeeklyLeaderboardScheduler
-
-        scheduler = WeeklyLeaderboardScheduler()
+        # Import here to avoid circular imports; the shared instance reuses its API client
+        from utils.weekly_leaderboard_scheduler import weekly_scheduler as scheduler
 
         # Check if a specific date was requested
         args = context.args if context.args else []
@@ -712,8 +724,6 @@ async def milestone_callback_handler(update: Update, context: ContextTypes.DEFAU
             )
 
             if success:
-                from bot.utils import format_wager_amount
-                from datetime import datetime
                 month_name = datetime.strptime(month_year, '%Y-%m').strftime('%B %Y')
 
                 message = f"✅ **Request Submitted!**\n\n"
@@ -803,9 +813,6 @@ async def pending_requests_handler(update: Update, context: ContextTypes.DEFAULT
         message = f"📋 **Pending Milestone Requests** ({len(pending_requests)})\n\n"
 
         for i, request in enumerate(pending_requests, 1):
-            from bot.utils import format_wager_amount
-            from datetime import datetime
-
             username = request['username']
             milestone_amount = request['milestone_amount']
             bonus_amount = request['bonus_amount']
@@ -860,7 +867,7 @@ async def approve_request_handler(update: Update, context: ContextTypes.DEFAULT_
         request_id = int(args[0])
         admin_notes = " ".join(args[1:]) if len(args) > 1 else "Approved by admin"
 
-        success = await update_milestone_request_status(request_id, "approved", user.id, admin_notes)
+        success = await milestone_tracker.update_request_status(request_id, "approved", user.id, admin_notes)
 
         if success:
             message = f"✅ **Request Approved**\n\nMilestone request #{request_id} has been approved."
@@ -909,7 +916,7 @@ async def deny_request_handler(update: Update, context: ContextTypes.DEFAULT_TYP
         request_id = int(args[0])
         admin_notes = " ".join(args[1:]) if len(args) > 1 else "Denied by admin"
 
-        success = await update_milestone_request_status(request_id, "denied", user.id, admin_notes)
+        success = await milestone_tracker.update_request_status(request_id, "denied", user.id, admin_notes)
 
         if success:
             message = f"❌ **Request Denied**\n\nMilestone request #{request_id} has been denied."
@@ -0,0 +1,80 @@
+"""
+Builds the Telegram Application with every command handler registered.
+"""
+
+from typing import Awaitable, Callable, Optional
+from telegram.ext import Application, CommandHandler, CallbackQueryHandler
+
+from bot.handlers import (
+    start_handler,
+    register_handler,
+    unregister_handler,
+    confirm_unregister_handler,
+    wager_handler,
+    leaderboard_handler,
+    help_handler,
+    milestones_handler,
+    milestone_info_handler,
+    milestone_callback_handler,
+    pending_requests_handler,
+    approve_request_handler,
+    deny_request_handler,
+    list_users,
+    stats,
+    weekly_leaderboard,
+    capture_leaderboard,
+    error_handler
+)
+
+# Command name -> handler, registered in one pass by build_telegram_application()
+COMMAND_HANDLERS = {
+    "start": start_handler,
+    "register": register_handler,
+    "unregister": unregister_handler,
+    "confirm_unregister": confirm_unregister_handler,
+    "wager": wager_handler,
+    "leaderboard": leaderboard_handler,
+    "help": help_handler,
+
+    # Milestone commands
+    "milestones": milestones_handler,
+    "milestone_info": milestone_info_handler,
+
+    # Admin commands
+    "users": list_users,
+    "stats": stats,
+    "weekly_leaderboard": weekly_leaderboard,
+    "capture_leaderboard": capture_leaderboard,
+    "pending": pending_requests_handler,
+    "approve": approve_request_handler,
+    "deny": deny_request_handler,
+}
+
+# Update types requested from getUpdates by every polling entry point
+ALLOWED_UPDATES = ("message", "callback_query")
+
+def build_telegram_application(
+    token: str,
+    post_init: Optional[Callable[[Application], Awaitable[None]]] = None,
+    post_shutdown: Optional[Callable[[Application], Awaitable[None]]] = None,
+) -> Application:
+    """Create the Telegram Application with all handlers and the error handler."""
+    builder = Application.builder().token(token)
+    if post_init is not None:
+        builder = builder.post_init(post_init)
+    if post_shutdown is not None:
+        builder = builder.post_shutdown(post_shutdown)
+    application = builder.build()
+
+    # Add command handlers plus the callback query handler for milestone buttons.
+    # block=False runs each handler as its own task so one slow update's DB/HTTP
+    # work does not hold up the updates queued behind it.
+    application.add_handlers(
+        [CommandHandler(name, callback, block=False) for name, callback in COMMAND_HANDLERS.items()]
+        + [CallbackQueryHandler(milestone_callback_handler, block=False)]
+    )
+
+    # Add error handler
+    application.add_error_handler(error_handler)
+
+    return application
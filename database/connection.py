@@ -6,1232 +6,1465 @@ import sqlite3
 import asyncio
 import logging
 import os
-from typing import Optional, Dict, Any, List
+import time
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, Callable, AsyncIterator
 from datetime import datetime, timedelta
 import json
 
+from database.pool import ConnectionPool
+
 logger = logging.getLogger(__name__)
 
+# [checked_at, 'YYYY-MM'] memo for current_month_year()
+_month_cache = [0.0, ""]
+
+def current_month_year() -> str:
+    """Return the current 'YYYY-MM' string, recomputed at most once a minute."""
+    now = time.time()
+    if now - _month_cache[0] > 60:
+        _month_cache[0] = now
+        _month_cache[1] = time.strftime('%Y-%m', time.localtime(now))
+    return _month_cache[1]
+
+# Schema and seed data, executed as a single script by init_database()
+SCHEMA_DDL = '''
+BEGIN;
+
+-- Users table
+CREATE TABLE IF NOT EXISTS users (
+    telegram_id INTEGER PRIMARY KEY,
+    telegram_username TEXT,
+    goated_username TEXT UNIQUE NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    is_active BOOLEAN DEFAULT 1,
+    last_wager_check TIMESTAMP,
+    last_leaderboard_check TIMESTAMP
+);
+
+-- Cache of API wager responses
+CREATE TABLE IF NOT EXISTS wager_cache (
+    username TEXT PRIMARY KEY,
+    daily_wager REAL,
+    weekly_wager REAL,
+    last_7_days_wager REAL,
+    monthly_wager REAL,
+    total_wager REAL,
+    cached_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP
+);
+
+-- Rolling 7-day totals derived from daily_wager_history; a row only counts
+-- for the local date in as_of
+CREATE TABLE IF NOT EXISTS rolling_7_day_cache (
+    username TEXT PRIMARY KEY,
+    total REAL NOT NULL,
+    as_of TEXT NOT NULL
+);
+
+-- Daily wager history for rolling totals
+CREATE TABLE IF NOT EXISTS daily_wager_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL,
+    date TEXT NOT NULL,
+    daily_wager REAL NOT NULL,
+    total_wager REAL,
+    recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(username, date)
+);
+
+-- Covers the rolling 7-day SUM without touching table rows
+DROP INDEX IF EXISTS idx_daily_wager_username_date;
+CREATE INDEX IF NOT EXISTS idx_dwh_user_date
+ON daily_wager_history(username, date, daily_wager);
+
+-- Cache of API leaderboard responses
+CREATE TABLE IF NOT EXISTS leaderboard_cache (
+    username TEXT PRIMARY KEY,
+    daily_rank INTEGER,
+    weekly_rank INTEGER,
+    last_7_days_rank INTEGER,
+    monthly_rank INTEGER,
+    all_time_rank INTEGER,
+    total_players INTEGER,
+    player_daily REAL,
+    player_weekly REAL,
+    player_last_7_days REAL,
+    player_monthly REAL,
+    player_all_time REAL,
+    cached_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP
+);
+
+-- Weekly top 10 leaderboard snapshots
+CREATE TABLE IF NOT EXISTS weekly_leaderboard_snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    snapshot_date TEXT NOT NULL,
+    rank_position INTEGER NOT NULL,
+    username TEXT NOT NULL,
+    affiliate_id TEXT,
+    daily_wager REAL,
+    weekly_wager REAL,
+    last_7_days_wager REAL,
+    monthly_wager REAL,
+    all_time_wager REAL,
+    total_players INTEGER,
+    captured_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(snapshot_date, rank_position)
+);
+
+CREATE INDEX IF NOT EXISTS idx_weekly_snapshots_date
+ON weekly_leaderboard_snapshots(snapshot_date);
+
+-- Monthly wager milestone achievements
+CREATE TABLE IF NOT EXISTS milestone_achievements (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL,
+    milestone_amount INTEGER NOT NULL,
+    bonus_amount REAL NOT NULL,
+    achieved_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    month_year TEXT NOT NULL,
+    monthly_wager_at_achievement REAL,
+    notified BOOLEAN DEFAULT 0,
+    UNIQUE(username, milestone_amount, month_year)
+);
+
+-- Covers the per-user/month milestone lookups; the UNIQUE index already
+-- serves plain username filters, so the old single-column index is dropped
+DROP INDEX IF EXISTS idx_milestone_username;
+CREATE INDEX IF NOT EXISTS idx_ma_user_month
+ON milestone_achievements(username, month_year, milestone_amount, bonus_amount, notified);
+
+-- Configurable milestone definitions
+CREATE TABLE IF NOT EXISTS milestone_definitions (
+    milestone_amount INTEGER PRIMARY KEY,
+    bonus_amount REAL NOT NULL,
+    description TEXT,
+    is_active BOOLEAN DEFAULT 1
+);
+
+-- Default milestone definitions (idempotent across restarts)
+INSERT OR IGNORE INTO milestone_definitions (milestone_amount, bonus_amount, description) VALUES
+    (10000, 10.0, '$10 for 10k wagered'),
+    (25000, 15.0, '$15 for 25k wagered'),
+    (50000, 25.0, '$25 for 50k wagered'),
+    (100000, 50.0, '$50 at 100k wagered');
+
+-- Milestone reward requests
+CREATE TABLE IF NOT EXISTS milestone_requests (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL,
+    telegram_id INTEGER NOT NULL,
+    milestone_amount INTEGER NOT NULL,
+    bonus_amount REAL NOT NULL,
+    month_year TEXT NOT NULL,
+    requested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    status TEXT DEFAULT 'pending',
+    admin_notes TEXT,
+    processed_by INTEGER,
+    processed_at TIMESTAMP,
+    UNIQUE(username, milestone_amount, month_year)
+);
+
+CREATE INDEX IF NOT EXISTS idx_milestone_requests_status
+ON milestone_requests(status);
+
+DROP INDEX IF EXISTS idx_milestone_requests_user;
+CREATE INDEX IF NOT EXISTS idx_mr_user_month
+ON milestone_requests(username, month_year, status);
+
+-- Command usage statistics
+CREATE TABLE IF NOT EXISTS bot_stats (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    telegram_id INTEGER,
+    command TEXT,
+    executed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    success BOOLEAN DEFAULT 1,
+    error_message TEXT
+);
+
+COMMIT;
+'''
+
+# Hot queries, kept as constants so the statement cache always sees the same text
+PENDING_REQUESTS_SQL = '''
+    SELECT id, username, telegram_id, milestone_amount, bonus_amount, month_year, requested_at, status
+    FROM milestone_requests
+    WHERE status = 'pending'
+    ORDER BY requested_at ASC
+'''
+USER_REQUESTS_FOR_MONTH_SQL = '''
+    SELECT id, milestone_amount, bonus_amount, month_year, requested_at, status, admin_notes, processed_at
+    FROM milestone_requests
+    WHERE username = ? AND month_year = ?
+    ORDER BY requested_at DESC
+'''
+USER_REQUESTS_SQL = '''
+    SELECT id, milestone_amount, bonus_amount, month_year, requested_at, status, admin_notes, processed_at
+    FROM milestone_requests
+    WHERE username = ?
+    ORDER BY requested_at DESC
+'''
+# Next unachieved milestone: the lowest of the next standard definition and,
+# from 100k up, the next 50k step bonus (standard wins ties)
+NEXT_MILESTONE_SQL = '''
+    WITH achieved AS (
+        SELECT milestone_amount FROM milestone_achievements
+        WHERE username = :u AND month_year = :m
+    )
+    SELECT milestone_amount, bonus_amount, description, step_bonus FROM (
+        SELECT milestone_amount, bonus_amount, description, 0 AS step_bonus
+        FROM milestone_definitions
+        WHERE is_active = 1 AND milestone_amount > :w
+        UNION ALL
+        SELECT (CAST(:w AS INTEGER) / 50000 + 1) * 50000, 50.0, NULL, 1
+        WHERE :w >= 100000
+    )
+    WHERE milestone_amount NOT IN achieved
+    ORDER BY milestone_amount, step_bonus
+    LIMIT 1
+'''
+
+# A month's achievements with the status of any reward request for each
+MONTHLY_ACHIEVEMENTS_WITH_REQUESTS_SQL = '''
+    SELECT ma.milestone_amount, ma.bonus_amount, mr.status AS request_status
+    FROM milestone_achievements ma
+    LEFT JOIN milestone_requests mr
+        ON mr.username = ma.username
+        AND mr.milestone_amount = ma.milestone_amount
+        AND mr.month_year = ma.month_year
+    WHERE ma.username = ? AND ma.month_year = ?
+    ORDER BY ma.milestone_amount
+'''
+
+# Rebuild every user's rolling 7-day total for today
+REFRESH_ROLLING_7_DAY_SQL = '''
+BEGIN;
+DELETE FROM rolling_7_day_cache;
+INSERT INTO rolling_7_day_cache (username, total, as_of)
+SELECT username, SUM(daily_wager), date('now', 'localtime')
+FROM daily_wager_history
+WHERE date > date('now', 'localtime', '-7 days') AND date <= date('now', 'localtime')
+GROUP BY username;
+COMMIT;
+'''
+
+# Recompute one user's rolling 7-day total for today
+REFRESH_USER_ROLLING_7_DAY_SQL = '''
+    INSERT OR REPLACE INTO rolling_7_day_cache (username, total, as_of)
+    SELECT :u, COALESCE(SUM(daily_wager), 0), date('now', 'localtime')
+    FROM daily_wager_history
+    WHERE username = :u
+    AND date > date('now', 'localtime', '-7 days') AND date <= date('now', 'localtime')
+'''
+
+ACTIVE_USERS_PAGE_SQL = '''
+    SELECT rowid AS _rowid, * FROM users
+    WHERE is_active = 1 AND rowid > ?
+    ORDER BY rowid LIMIT ?
+'''
+
+@lru_cache(maxsize=128)
+def _row_keys(description: tuple) -> tuple:
+    """Column names for a cursor description, computed once per query shape."""
+    return tuple(column[0] for column in description)
+
+def dict_row_factory(cursor: sqlite3.Cursor, row: tuple) -> Dict[str, Any]:
+    """Build result dicts straight from the raw tuple, skipping the sqlite3.Row copy."""
+    return dict(zip(_row_keys(cursor.description), row))
+
 class DatabaseManager:
     """Manages database connections and operations."""
 
+    # Seconds between background PRAGMA optimize runs
+    OPTIMIZE_INTERVAL = 3600
+    # Command-usage rows are written in batches of up to this many rows...
+    COMMAND_LOG_BATCH_SIZE = 100
+    # ...or whatever has queued up after this many seconds
+    COMMAND_LOG_FLUSH_INTERVAL = 1.0
+
     def __init__(self):
         database_url = os.getenv('DATABASE_URL', 'sqlite:///goated_bot.db')
         self.db_path = database_url.replace('sqlite:///', '')
-        self._lock = asyncio.Lock()
-    
+        self.read_pool_size = int(os.getenv('DB_READ_POOL_SIZE', '8'))
+        self._optimize_task: Optional[asyncio.Task] = None
+
+        # One shared read-write connection plus a small pool of read-only ones
+        self.pool = ConnectionPool(self.db_path, self.read_pool_size)
+
+        # Set once the schema exists and the file is in WAL mode
+        self._initialized = asyncio.Event()
+
+        # Background batch writer for bot_stats rows, started on first use
+        self.has_bot_stats = False
+        self._command_log: Optional[asyncio.Queue] = None
+        self._command_log_task: Optional[asyncio.Task] = None
+
+    def writer(self):
+        """Yield the shared read-write connection under the write lock."""
+        return self.pool.acquire_writer()
+
+    def reader(self):
+        """Yield a read-only connection from the pool."""
+        return self.pool.acquire_reader()
+
+    def acquire(self, write: bool = False):
+        """Check out a pooled connection: ``async with db_manager.acquire() as conn:``.
+
+        Read-only by default; pass write=True for the shared read-write connection.
+        """
+        return self.writer() if write else self.reader()
+
+    @staticmethod
+    async def _run_in_thread(fn: Callable[[sqlite3.Connection], Any], conn: sqlite3.Connection) -> Any:
+        """Run fn(conn) in a worker thread so SQLite I/O never blocks the event loop."""
+        task = asyncio.ensure_future(asyncio.to_thread(fn, conn))
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # Keep the connection checked out until the thread is done with it
+            await asyncio.wait({task})
+            raise
+
+    async def read(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run fn(conn) on a pooled read-only connection in a worker thread."""
+        async with self.reader() as conn:
+            return await self._run_in_thread(fn, conn)
+
+    async def write(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run fn(conn) on the shared read-write connection in a worker thread."""
+        async with self.writer() as conn:
+            return await self._run_in_thread(fn, conn)
+
     async def init_database(self):
         """Initialize the database with required tables."""
-        async with self._lock:
-            try:
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                
-                # Create users table
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS users (
-                        telegram_id INTEGER PRIMARY KEY,
-                        telegram_username TEXT,
-                        goated_username TEXT UNIQUE NOT NULL,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        is_active BOOLEAN DEFAULT 1,
-                        last_wager_check TIMESTAMP,
-                        last_leaderboard_check TIMESTAMP
-                    )
-                ''')
-                
-                # Create wager_cache table for caching API responses
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS wager_cache (
-                        username TEXT PRIMARY KEY,
-                        daily_wager REAL,
-                        weekly_wager REAL,
-                        last_7_days_wager REAL,
-                        monthly_wager REAL,
-                        total_wager REAL,
-                        cached_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        expires_at TIMESTAMP
-                    )
-                ''')
-                
-                # Create daily_wager_history table for tracking daily wagers
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS daily_wager_history (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        username TEXT NOT NULL,
-                        date TEXT NOT NULL,
-                        daily_wager REAL NOT NULL,
-                        total_wager REAL,
-                        recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        UNIQUE(username, date)
-                    )
-                ''')
-
-                # Create index for faster queries
-                cursor.execute('''
-                    CREATE INDEX IF NOT EXISTS idx_daily_wager_username_date
-                    ON daily_wager_history(username, date)
-                ''')
+        def run(conn: sqlite3.Connection):
+            # WAL is stored in the database file, so switching once at startup
+            # covers every later connection
+            conn.execute('PRAGMA journal_mode=WAL')
 
-                # Create leaderboard_cache table
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS leaderboard_cache (
-                        username TEXT PRIMARY KEY,
-                        daily_rank INTEGER,
-                        weekly_rank INTEGER,
-                        last_7_days_rank INTEGER,
-                        monthly_rank INTEGER,
-                        all_time_rank INTEGER,
-                        total_players INTEGER,
-                        player_daily REAL,
-                        player_weekly REAL,
-                        player_last_7_days REAL,
-                        player_monthly REAL,
-                        player_all_time REAL,
-                        cached_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        expires_at TIMESTAMP
-                    )
-                ''')
-
-                # Create weekly_leaderboard_snapshots table for storing top 10 weekly
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS weekly_leaderboard_snapshots (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        snapshot_date TEXT NOT NULL,
-                        rank_position INTEGER NOT NULL,
-                        username TEXT NOT NULL,
-                        affiliate_id TEXT,
-                        daily_wager REAL,
-                        weekly_wager REAL,
-                        last_7_days_wager REAL,
-                        monthly_wager REAL,
-                        all_time_wager REAL,
-                        total_players INTEGER,
-                        captured_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        UNIQUE(snapshot_date, rank_position)
-                    )
-                ''')
-
-                # Create index for faster queries on weekly snapshots
-                cursor.execute('''
-                    CREATE INDEX IF NOT EXISTS idx_weekly_snapshots_date
-                    ON weekly_leaderboard_snapshots(snapshot_date)
-                ''')
+            # Run the whole schema + seed as one transaction (one parse, one fsync)
+            with conn:
+                conn.executescript(SCHEMA_DDL)
 
-                # Create milestone_achievements table for tracking monthly wager milestones
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS milestone_achievements (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        username TEXT NOT NULL,
-                        milestone_amount INTEGER NOT NULL,
-                        bonus_amount REAL NOT NULL,
-                        achieved_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        month_year TEXT NOT NULL,
-                        monthly_wager_at_achievement REAL,
-                        notified BOOLEAN DEFAULT 0,
-                        UNIQUE(username, milestone_amount, month_year)
-                    )
-                ''')
-
-                # Create index for faster milestone queries
-                cursor.execute('''
-                    CREATE INDEX IF NOT EXISTS idx_milestone_username
-                    ON milestone_achievements(username)
-                ''')
+            # Give the query planner fresh statistics for the indexes above
+            conn.execute("PRAGMA analysis_limit=400")
+            conn.execute("PRAGMA optimize")
 
-                # Create milestone_definitions table for configurable milestones
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS milestone_definitions (
-                        milestone_amount INTEGER PRIMARY KEY,
-                        bonus_amount REAL NOT NULL,
-                        description TEXT,
-                        is_active BOOLEAN DEFAULT 1
-                    )
-                ''')
-
-                # Insert default milestone definitions
-                cursor.execute('''
-                    INSERT OR IGNORE INTO milestone_definitions
-                    (milestone_amount, bonus_amount, description) VALUES
-                    (10000, 10.0, '$10 for 10k wagered'),
-                    (25000, 15.0, '$15 for 25k wagered'),
-                    (50000, 25.0, '$25 for 50k wagered'),
-                    (100000, 50.0, '$50 at 100k wagered')
-                ''')
-
-                # Create milestone_requests table for tracking reward requests
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS milestone_requests (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        username TEXT NOT NULL,
-                        telegram_id INTEGER NOT NULL,
-                        milestone_amount INTEGER NOT NULL,
-                        bonus_amount REAL NOT NULL,
-                        month_year TEXT NOT NULL,
-                        requested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        status TEXT DEFAULT 'pending',
-                        admin_notes TEXT,
-                        processed_by INTEGER,
-                        processed_at TIMESTAMP,
-                        UNIQUE(username, milestone_amount, month_year)
-                    )
-                ''')
-
-                # Create indexes for faster request queries
-                cursor.execute('''
-                    CREATE INDEX IF NOT EXISTS idx_milestone_requests_status
-                    ON milestone_requests(status)
-                ''')
+            return conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='bot_stats'"
+            ).fetchone() is not None
 
-                cursor.execute('''
-                    CREATE INDEX IF NOT EXISTS idx_milestone_requests_user
-                    ON milestone_requests(username, month_year)
-                ''')
+        try:
+            self.has_bot_stats = await self.write(run)
+            self._initialized.set()
+            await self.refresh_rolling_7_day_cache()
+            logger.info("Database initialized successfully")
+        except Exception as e:
+            logger.error(f"Error initializing database: {e}")
+            raise
 
-                # Create bot_stats table for tracking usage
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS bot_stats (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        telegram_id INTEGER,
-                        command TEXT,
-                        executed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        success BOOLEAN DEFAULT 1,
-                        error_message TEXT
-                    )
-                ''')
-                
-                conn.commit()
-                conn.close()
-                logger.info("Database initialized successfully")
-                
-            except Exception as e:
-                logger.error(f"Error initializing database: {e}")
-                raise
+    async def init_database_then_migrate(self):
+        """Initialize the schema, then make sure the users table has Discord support."""
+        from railway_migrate import ensure_discord_support
 
-# Global database manager instance
-db_manager = DatabaseManager()
+        await self.init_database()
+        await ensure_discord_support()
+
+    async def wait_until_ready(self):
+        """Wait until init_database() has created the schema."""
+        await self._initialized.wait()
+
+    async def warm_readers(self):
+        """Open the read-only pool ahead of the first query.
+
+        Safe to run alongside init_database(): it waits until the schema and
+        WAL mode are in place before opening any read-only connection.
+        """
+        await self.wait_until_ready()
+
+        def ping(conn: sqlite3.Connection):
+            conn.execute("SELECT 1").fetchone()
+
+        # Concurrent checkouts each find the pool empty, so each opens a connection
+        await asyncio.gather(*(self.read(ping) for _ in range(self.read_pool_size)))
+
+    async def optimize(self):
+        """Run PRAGMA optimize so query plans keep using the right indexes."""
+        def run(conn: sqlite3.Connection):
+            conn.execute("PRAGMA analysis_limit=400")
+            conn.execute("PRAGMA optimize")
 
-async def get_user(telegram_id: int = None, discord_id: int = None) -> Optional[Dict[str, Any]]:
-    """Get user by Telegram ID or Discord ID."""
-    async with db_manager._lock:
         try:
-            conn = sqlite3.connect(db_manager.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            await self.write(run)
+        except Exception as e:
+            logger.error(f"Error optimizing database: {e}")
+
+    async def refresh_rolling_7_day_cache(self):
+        """Recompute the cached rolling 7-day totals for every user."""
+        def run(conn: sqlite3.Connection):
+            conn.executescript(REFRESH_ROLLING_7_DAY_SQL)
 
-            if discord_id:
-                cursor.execute(
-                    "SELECT * FROM users WHERE discord_id = ? AND is_active = 1",
-                    (discord_id,)
-                )
-            elif telegram_id:
-                cursor.execute(
-                    "SELECT * FROM users WHERE telegram_id = ? AND is_active = 1",
-                    (telegram_id,)
-                )
+        try:
+            await self.write(run)
+        except Exception as e:
+            logger.error(f"Error refreshing rolling 7-day cache: {e}")
+
+    async def _optimize_loop(self):
+        """Refresh rolling totals and re-run PRAGMA optimize every OPTIMIZE_INTERVAL seconds."""
+        while True:
+            await asyncio.sleep(self.OPTIMIZE_INTERVAL)
+            await self.refresh_rolling_7_day_cache()
+            await self.optimize()
+
+    def start_maintenance(self):
+        """Start the hourly maintenance task on the running event loop."""
+        if self._optimize_task is None or self._optimize_task.done():
+            self._optimize_task = asyncio.get_running_loop().create_task(self._optimize_loop())
+
+    def log_command(self, row: tuple):
+        """Queue a (telegram_id, command, success, error_message) row for bot_stats."""
+        if not self.has_bot_stats:
+            return
+
+        # Both bots share one event loop, so the queue is always used from that loop
+        if self._command_log_task is None or self._command_log_task.done():
+            self._command_log = asyncio.Queue()
+            self._command_log_task = asyncio.get_running_loop().create_task(self._command_log_writer())
+        self._command_log.put_nowait(row)
+
+    async def _write_command_log(self, rows: List[tuple]):
+        """Insert a batch of bot_stats rows in one transaction."""
+        def run(conn: sqlite3.Connection):
+            with conn:
+                conn.executemany('''
+                    INSERT INTO bot_stats (telegram_id, command, success, error_message)
+                    VALUES (?, ?, ?, ?)
+                ''', rows)
+
+        try:
+            await self.write(run)
+        except sqlite3.OperationalError as e:
+            if "database is locked" in str(e) or "database is busy" in str(e):
+                # Analytics only: drop the batch rather than stall the writer queue
+                logger.debug(f"Skipping {len(rows)} command usage rows due to database lock")
             else:
-                conn.close()
-                return None
+                logger.error(f"Error logging command usage: {e}")
+        except Exception as e:
+            logger.error(f"Error logging command usage: {e}")
 
-            row = cursor.fetchone()
-            conn.close()
+    async def _command_log_writer(self):
+        """Drain the command log queue, flushing on batch size or flush interval.
+
+        A None item asks the writer to flush what it has and exit.
+        """
+        queue = self._command_log
+        loop = asyncio.get_running_loop()
+        while True:
+            row = await queue.get()
+            if row is None:
+                return
+
+            batch = [row]
+            stopping = False
+            deadline = loop.time() + self.COMMAND_LOG_FLUSH_INTERVAL
+            while len(batch) < self.COMMAND_LOG_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if row is None:
+                    stopping = True
+                    break
+                batch.append(row)
+
+            await self._write_command_log(batch)
+            if stopping:
+                return
+
+    async def _stop_command_log(self):
+        """Flush queued command-usage rows and stop the batch writer."""
+        if self._command_log_task is None:
+            return
+        if not self._command_log_task.done():
+            self._command_log.put_nowait(None)
+            await self._command_log_task
+        self._command_log_task = None
+        self._command_log = None
+
+    async def close(self):
+        """Stop background tasks, run a final PRAGMA optimize and close connections."""
+        if self._optimize_task is not None:
+            self._optimize_task.cancel()
+            try:
+                await self._optimize_task
+            except asyncio.CancelledError:
+                pass
+            self._optimize_task = None
+        await self._stop_command_log()
+        await self.optimize()
 
-            if row:
-                return dict(row)
-            return None
+        await self.pool.close()
+        self._initialized.clear()
 
-        except Exception as e:
-            logger.error(f"Error getting user (telegram: {telegram_id}, discord: {discord_id}): {e}")
+# Global database manager instance
+db_manager = DatabaseManager()
+
+async def get_user(telegram_id: int = None, discord_id: int = None,
+                   goated_username: str = None) -> Optional[Dict[str, Any]]:
+    """Get user by Telegram ID, Discord ID or Goated username."""
+    def run(conn: sqlite3.Connection):
+        cursor = conn.cursor()
+        cursor.row_factory = dict_row_factory
+
+        if discord_id:
+            cursor.execute(
+                "SELECT * FROM users WHERE discord_id = ? AND is_active = 1",
+                (discord_id,)
+            )
+        elif telegram_id:
+            cursor.execute(
+                "SELECT * FROM users WHERE telegram_id = ? AND is_active = 1",
+                (telegram_id,)
+            )
+        elif goated_username:
+            cursor.execute(
+                "SELECT * FROM users WHERE goated_username = ? AND is_active = 1",
+                (goated_username,)
+            )
+        else:
             return None
 
+        return cursor.fetchone()
+
+    try:
+        return await db_manager.read(run)
+    except Exception as e:
+        logger.error(f"Error getting user (telegram: {telegram_id}, discord: {discord_id}, goated: {goated_username}): {e}")
+        return None
+
 async def create_user(telegram_id: int = None, telegram_username: Optional[str] = None, goated_username: str = None,
                      discord_id: int = None, discord_username: str = None, platform: str = 'telegram') -> bool:
     """Create a new user for either Telegram or Discord."""
-    async with db_manager._lock:
-        try:
-            conn = sqlite3.connect(db_manager.db_path)
-            cursor = conn.cursor()
+    def run(conn: sqlite3.Connection):
+        cursor = conn.cursor()
 
-            if platform == 'discord':
-                cursor.execute('''
-                    INSERT INTO users (discord_id, discord_username, goated_username, platform)
-                    VALUES (?, ?, ?, ?)
-                ''', (discord_id, discord_username, goated_username, platform))
-                logger.info(f"Created Discord user {discord_id} with goated username {goated_username}")
-            else:
-                cursor.execute('''
-                    INSERT INTO users (telegram_id, telegram_username, goated_username, platform)
-                    VALUES (?, ?, ?, ?)
-                ''', (telegram_id, telegram_username, goated_username, platform))
-                logger.info(f"Created Telegram user {telegram_id} with goated username {goated_username}")
+        if platform == 'discord':
+            cursor.execute('''
+                INSERT INTO users (discord_id, discord_username, goated_username, platform)
+                VALUES (?, ?, ?, ?)
+            ''', (discord_id, discord_username, goated_username, platform))
+            logger.info(f"Created Discord user {discord_id} with goated username {goated_username}")
+        else:
+            cursor.execute('''
+                INSERT INTO users (telegram_id, telegram_username, goated_username, platform)
+                VALUES (?, ?, ?, ?)
+            ''', (telegram_id, telegram_username, goated_username, platform))
+            logger.info(f"Created Telegram user {telegram_id} with goated username {goated_username}")
 
-            conn.commit()
-            conn.close()
-            return True
+        conn.commit()
+        return True
 
-        except sqlite3.IntegrityError as e:
-            logger.error(f"User creation failed - duplicate goated username: {e}")
-            return False
-        except Exception as e:
-            logger.error(f"Error creating user: {e}")
-            return False
+    try:
+        return await db_manager.write(run)
+    except sqlite3.IntegrityError as e:
+        logger.error(f"User creation failed - duplicate goated username: {e}")
+        return False
+    except Exception as e:
+        logger.error(f"Error creating user: {e}")
+        return False
 
 async def update_user(telegram_id: int, **kwargs) -> bool:
     """Update user information."""
-    async with db_manager._lock:
-        try:
-            if not kwargs:
-                return True
-            
-            # Build dynamic update query
-            set_clauses = []
-            values = []
-            
-            for key, value in kwargs.items():
-                if key in ['telegram_username', 'goated_username', 'is_active', 'last_wager_check', 'last_leaderboard_check']:
-                    set_clauses.append(f"{key} = ?")
-                    values.append(value)
-            
-            if not set_clauses:
-                return True
-            
-            set_clauses.append("updated_at = CURRENT_TIMESTAMP")
-            values.append(telegram_id)
-            
-            conn = sqlite3.connect(db_manager.db_path)
-            cursor = conn.cursor()
-            
-            query = f"UPDATE users SET {', '.join(set_clauses)} WHERE telegram_id = ?"
-            cursor.execute(query, values)
-            
-            conn.commit()
-            conn.close()
-            
-            logger.info(f"Updated user {telegram_id}")
+    def run(conn: sqlite3.Connection):
+        if not kwargs:
             return True
-            
-        except Exception as e:
-            logger.error(f"Error updating user {telegram_id}: {e}")
-            return False
+
+        # Build dynamic update query
+        set_clauses = []
+        values = []
+
+        for key, value in kwargs.items():
+            if key in ['telegram_username', 'goated_username', 'is_active', 'last_wager_check', 'last_leaderboard_check']:
+                set_clauses.append(f"{key} = ?")
+                values.append(value)
+
+        if not set_clauses:
+            return True
+
+        set_clauses.append("updated_at = CURRENT_TIMESTAMP")
+        values.append(telegram_id)
+
+        cursor = conn.cursor()
+
+        query = f"UPDATE users SET {', '.join(set_clauses)} WHERE telegram_id = ?"
+        cursor.execute(query, values)
+
+        conn.commit()
+
+        logger.info(f"Updated user {telegram_id}")
+        return True
+
+    try:
+        return await db_manager.write(run)
+    except Exception as e:
+        logger.error(f"Error updating user {telegram_id}: {e}")
+        return False
 
 async def cache_wager_data(username: str, wager_data: Dict[str, Any], cache_duration_minutes: int = 5) -> bool:
     """Cache wager data to reduce API calls."""
-    async with db_manager._lock:
-        try:
-            conn = sqlite3.connect(db_manager.db_path)
-            cursor = conn.cursor()
+    def run(conn: sqlite3.Connection):
+        cursor = conn.cursor()
 
-            expires_at = datetime.now().timestamp() + (cache_duration_minutes * 60)
+        expires_at = datetime.now().timestamp() + (cache_duration_minutes * 60)
 
-            cursor.execute('''
-                INSERT OR REPLACE INTO wager_cache
-                (username, daily_wager, weekly_wager, last_7_days_wager, monthly_wager, total_wager, expires_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                username,
-                wager_data.get('daily_wager', 0),
-                wager_data.get('weekly_wager', 0),
-                wager_data.get('last_7_days_wager', wager_data.get('weekly_wager', 0)),  # Use weekly as fallback for last 7 days
-                wager_data.get('monthly_wager', 0),
-                wager_data.get('total_wager', 0),
-                expires_at
-            ))
-
-            conn.commit()
-            conn.close()
+        cursor.execute('''
+            INSERT OR REPLACE INTO wager_cache
+            (username, daily_wager, weekly_wager, last_7_days_wager, monthly_wager, total_wager, expires_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            username,
+            wager_data.get('daily_wager', 0),
+            wager_data.get('weekly_wager', 0),
+            wager_data.get('last_7_days_wager', wager_data.get('weekly_wager', 0)),  # Use weekly as fallback for last 7 days
+            wager_data.get('monthly_wager', 0),
+            wager_data.get('total_wager', 0),
+            expires_at
+        ))
 
-            return True
+        conn.commit()
 
-        except Exception as e:
-            logger.error(f"Error caching wager data for {username}: {e}")
-            return False
+        return True
+
+    try:
+        return await db_manager.write(run)
+    except Exception as e:
+        logger.error(f"Error caching wager data for {username}: {e}")
+        return False
 
 async def get_cached_wager_data(username: str) -> Optional[Dict[str, Any]]:
     """Get cached wager data if still valid."""
-    async with db_manager._lock:
-        try:
-            conn = sqlite3.connect(db_manager.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+    def run(conn: sqlite3.Connection):
+        cursor = conn.cursor()
 
-            cursor.execute('''
-                SELECT * FROM wager_cache
-                WHERE username = ? AND expires_at > ?
-            ''', (username, datetime.now().timestamp()))
-
-            row = cursor.fetchone()
-            conn.close()
-
-            if row:
-                return {
-                    'daily_wager': row['daily_wager'],
-                    'weekly_wager': row['weekly_wager'],
-                    'last_7_days_wager': row['last_7_days_wager'],
-                    'monthly_wager': row['monthly_wager'],
-                    'total_wager': row['total_wager'],
-                    'username': username,
-                    'last_updated': row['cached_at']
-                }
+        cursor.execute('''
+            SELECT * FROM wager_cache
+            WHERE username = ? AND expires_at > ?
+        ''', (username, datetime.now().timestamp()))
 
-            return None
+        row = cursor.fetchone()
 
-        except Exception as e:
-            logger.error(f"Error getting cached wager data for {username}: {e}")
-            return None
+        if row:
+            return {
+                'daily_wager': row['daily_wager'],
+                'weekly_wager': row['weekly_wager'],
+                'last_7_days_wager': row['last_7_days_wager'],
+                'monthly_wager': row['monthly_wager'],
+                'total_wager': row['total_wager'],
+                'username': username,
+                'last_updated': row['cached_at']
+            }
+
+        return None
+
+    try:
+        return await db_manager.read(run)
+    except Exception as e:
+        logger.error(f"Error getting cached wager data for {username}: {e}")
+        return None
 
 async def cache_leaderboard_data(username: str, leaderboard_data: Dict[str, Any], cache_duration_minutes: int = 5) -> bool:
     """Cache leaderboard data to reduce API calls."""
-    async with db_manager._lock:
-        try:
-            conn = sqlite3.connect(db_manager.db_path)
-            cursor = conn.cursor()
+    def run(conn: sqlite3.Connection):
+        cursor = conn.cursor()
 
-            expires_at = datetime.now().timestamp() + (cache_duration_minutes * 60)
+        expires_at = datetime.now().timestamp() + (cache_duration_minutes * 60)
 
-            cursor.execute('''
-                INSERT OR REPLACE INTO leaderboard_cache
-                (username, daily_rank, weekly_rank, last_7_days_rank, monthly_rank, all_time_rank,
-                 total_players, player_daily, player_weekly, player_last_7_days, player_monthly, player_all_time, expires_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                username,
-                leaderboard_data.get('daily_rank'),
-                leaderboard_data.get('weekly_rank'),
-                leaderboard_data.get('last_7_days_rank', leaderboard_data.get('weekly_rank')),  # Use weekly rank as fallback
-                leaderboard_data.get('monthly_rank'),
-                leaderboard_data.get('all_time_rank'),
-                leaderboard_data.get('total_players'),
-                leaderboard_data.get('player_daily'),
-                leaderboard_data.get('player_weekly'),
-                leaderboard_data.get('player_last_7_days', leaderboard_data.get('player_weekly')),  # Use weekly as fallback
-                leaderboard_data.get('player_monthly'),
-                leaderboard_data.get('player_all_time'),
-                expires_at
-            ))
-
-            conn.commit()
-            conn.close()
+        cursor.execute('''
+            INSERT OR REPLACE INTO leaderboard_cache
+            (username, daily_rank, weekly_rank, last_7_days_rank, monthly_rank, all_time_rank,
+             total_players, player_daily, player_weekly, player_last_7_days, player_monthly, player_all_time, expires_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            username,
+            leaderboard_data.get('daily_rank'),
+            leaderboard_data.get('weekly_rank'),
+            leaderboard_data.get('last_7_days_rank', leaderboard_data.get('weekly_rank')),  # Use weekly rank as fallback
+            leaderboard_data.get('monthly_rank'),
+            leaderboard_data.get('all_time_rank'),
+            leaderboard_data.get('total_players'),
+            leaderboard_data.get('player_daily'),
+            leaderboard_data.get('player_weekly'),
+            leaderboard_data.get('player_last_7_days', leaderboard_data.get('player_weekly')),  # Use weekly as fallback
+            leaderboard_data.get('player_monthly'),
+            leaderboard_data.get('player_all_time'),
+            expires_at
+        ))
 
-            return True
+        conn.commit()
 
-        except Exception as e:
-            logger.error(f"Error caching leaderboard data for {username}: {e}")
-            return False
+        return True
+
+    try:
+        return await db_manager.write(run)
+    except Exception as e:
+        logger.error(f"Error caching leaderboard data for {username}: {e}")
+        return False
 
 async def get_cached_leaderboard_data(username: str) -> Optional[Dict[str, Any]]:
     """Get cached leaderboard data if still valid."""
-    async with db_manager._lock:
-        try:
-            conn = sqlite3.connect(db_manager.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+    def run(conn: sqlite3.Connection):
+        cursor = conn.cursor()
 
-            cursor.execute('''
-                SELECT * FROM leaderboard_cache
-                WHERE username = ? AND expires_at > ?
-            ''', (username, datetime.now().timestamp()))
-
-            row = cursor.fetchone()
-            conn.close()
-
-            if row:
-                return {
-                    'username': username,
-                    'daily_rank': row['daily_rank'],
-                    'weekly_rank': row['weekly_rank'],
-                    'last_7_days_rank': row['last_7_days_rank'],
-                    'monthly_rank': row['monthly_rank'],
-                    'all_time_rank': row['all_time_rank'],
-                    'total_players': row['total_players'],
-                    'player_daily': row['player_daily'],
-                    'player_weekly': row['player_weekly'],
-                    'player_last_7_days': row['player_last_7_days'],
-                    'player_monthly': row['player_monthly'],
-                    'player_all_time': row['player_all_time'],
-                    'last_updated': row['cached_at']
-                }
+        cursor.execute('''
+            SELECT * FROM leaderboard_cache
+            WHERE username = ? AND expires_at > ?
+        ''', (username, datetime.now().timestamp()))
 
-            return None
+        row = cursor.fetchone()
 
-        except Exception as e:
-            logger.error(f"Error getting cached leaderboard data for {username}: {e}")
-            return None
+        if row:
+            return {
+                'username': username,
+                'daily_rank': row['daily_rank'],
+                'weekly_rank': row['weekly_rank'],
+                'last_7_days_rank': row['last_7_days_rank'],
+                'monthly_rank': row['monthly_rank'],
+                'all_time_rank': row['all_time_rank'],
+                'total_players': row['total_players'],
+                'player_daily': row['player_daily'],
+                'player_weekly': row['player_weekly'],
+                'player_last_7_days': row['player_last_7_days'],
+                'player_monthly': row['player_monthly'],
+                'player_all_time': row['player_all_time'],
+                'last_updated': row['cached_at']
+            }
 
-async def store_weekly_leaderboard_snapshot(snapshot_date: str, leaderboard_data: List[Dict[str, Any]]) -> bool:
-    """Store a weekly leaderboard snapshot with top 10 users."""
-    async with db_manager._lock:
-        try:
-            conn = sqlite3.connect(db_manager.db_path)
-            cursor = conn.cursor()
+        return None
 
-            # Clear any existing data for this snapshot date
-            cursor.execute('DELETE FROM weekly_leaderboard_snapshots WHERE snapshot_date = ?', (snapshot_date,))
+    try:
+        return await db_manager.read(run)
+    except Exception as e:
+        logger.error(f"Error getting cached leaderboard data for {username}: {e}")
+        return None
 
-            # Insert the top 10 users
-            for i, player_data in enumerate(leaderboard_data[:10], 1):
-                cursor.execute('''
-                    INSERT INTO weekly_leaderboard_snapshots
-                    (snapshot_date, rank_position, username, affiliate_id, daily_wager, weekly_wager,
-                     last_7_days_wager, monthly_wager, all_time_wager, total_players)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    snapshot_date,
-                    i,  # rank position (1-10)
-                    player_data.get('username', ''),
-                    player_data.get('affiliate_id', ''),
-                    player_data.get('daily_wager', 0),
-                    player_data.get('weekly_wager', 0),
-                    player_data.get('last_7_days_wager', 0),
-                    player_data.get('monthly_wager', 0),
-                    player_data.get('all_time_wager', 0),
-                    player_data.get('total_players', 0)
-                ))
-
-            conn.commit()
-            conn.close()
-
-            logger.info(f"Stored weekly leaderboard snapshot for {snapshot_date} with {len(leaderboard_data[:10])} players")
-            return True
+async def store_weekly_leaderboard_snapshot(snapshot_date: str, leaderboard_data: List[Dict[str, Any]]) -> bool:
+    """Store a weekly leaderboard snapshot with top 10 users."""
+    def run(conn: sqlite3.Connection):
+        top_players = leaderboard_data[:10]
+        rows = [(
+            snapshot_date,
+            i,  # rank position (1-10)
+            player_data.get('username', ''),
+            player_data.get('affiliate_id', ''),
+            player_data.get('daily_wager', 0),
+            player_data.get('weekly_wager', 0),
+            player_data.get('last_7_days_wager', 0),
+            player_data.get('monthly_wager', 0),
+            player_data.get('all_time_wager', 0),
+            player_data.get('total_players', 0)
+        ) for i, player_data in enumerate(top_players, 1)]
+
+        # Replace any existing data for this snapshot date in one transaction
+        with conn:
+            conn.execute('DELETE FROM weekly_leaderboard_snapshots WHERE snapshot_date = ?', (snapshot_date,))
+            conn.executemany('''
+                INSERT INTO weekly_leaderboard_snapshots
+                (snapshot_date, rank_position, username, affiliate_id, daily_wager, weekly_wager,
+                 last_7_days_wager, monthly_wager, all_time_wager, total_players)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+
+        logger.info(f"Stored weekly leaderboard snapshot for {snapshot_date} with {len(rows)} players")
+        return True
 
-        except Exception as e:
-            logger.error(f"Error storing weekly leaderboard snapshot for {snapshot_date}: {e}")
-            return False
+    try:
+        return await db_manager.write(run)
+    except Exception as e:
+        logger.error(f"Error storing weekly leaderboard snapshot for {snapshot_date}: {e}")
+        return False
 
 async def get_weekly_leaderboard_snapshots(limit: int = 10) -> List[Dict[str, Any]]:
     """Get the most recent weekly leaderboard snapshots."""
-    async with db_manager._lock:
-        try:
-            conn = sqlite3.connect(db_manager.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-
-            cursor.execute('''
-                SELECT DISTINCT snapshot_date, captured_at
-                FROM weekly_leaderboard_snapshots
-                ORDER BY snapshot_date DESC
-                LIMIT ?
-            ''', (limit,))
-
-            snapshots = []
-            for row in cursor.fetchall():
-                snapshot_date = row['snapshot_date']
-
-                # Get the top 10 for this snapshot
-                cursor.execute('''
-                    SELECT * FROM weekly_leaderboard_snapshots
-                    WHERE snapshot_date = ?
-                    ORDER BY rank_position
-                ''', (snapshot_date,))
-
-                players = []
-                for player_row in cursor.fetchall():
-                    players.append({
-                        'rank': player_row['rank_position'],
-                        'username': player_row['username'],
-                        'affiliate_id': player_row['affiliate_id'],
-                        'daily_wager': player_row['daily_wager'],
-                        'weekly_wager': player_row['weekly_wager'],
-                        'last_7_days_wager': player_row['last_7_days_wager'],
-                        'monthly_wager': player_row['monthly_wager'],
-                        'all_time_wager': player_row['all_time_wager'],
-                        'total_players': player_row['total_players']
-                    })
-
-                snapshots.append({
-                    'snapshot_date': snapshot_date,
-                    'captured_at': row['captured_at'],
-                    'players': players
-                })
-
-            conn.close()
-            return snapshots
-
-        except Exception as e:
-            logger.error(f"Error getting weekly leaderboard snapshots: {e}")
-            return []
-
-async def get_weekly_leaderboard_snapshot(snapshot_date: str) -> Optional[Dict[str, Any]]:
-    """Get a specific weekly leaderboard snapshot by date."""
-    async with db_manager._lock:
-        try:
-            conn = sqlite3.connect(db_manager.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+    def run(conn: sqlite3.Connection):
+        cursor = conn.cursor()
 
-            cursor.execute('''
+        cursor.execute('''
+            SELECT DISTINCT snapshot_date, captured_at
+            FROM weekly_leaderboard_snapshots
+            ORDER BY snapshot_date DESC
+            LIMIT ?
+        ''', (limit,))
+
+        snapshots = []
+        for row in cursor:
+            snapshot_date = row['snapshot_date']
+
+            # Get the top 10 for this snapshot (separate cursor so the outer one keeps streaming)
+            player_cursor = conn.execute('''
                 SELECT * FROM weekly_leaderboard_snapshots
                 WHERE snapshot_date = ?
                 ORDER BY rank_position
             ''', (snapshot_date,))
 
-            rows = cursor.fetchall()
-            conn.close()
-
-            if not rows:
-                return None
-
             players = []
-            for row in rows:
+            for player_row in player_cursor:
                 players.append({
-                    'rank': row['rank_position'],
-                    'username': row['username'],
-                    'affiliate_id': row['affiliate_id'],
-                    'daily_wager': row['daily_wager'],
-                    'weekly_wager': row['weekly_wager'],
-                    'last_7_days_wager': row['last_7_days_wager'],
-                    'monthly_wager': row['monthly_wager'],
-                    'all_time_wager': row['all_time_wager'],
-                    'total_players': row['total_players']
+                    'rank': player_row['rank_position'],
+                    'username': player_row['username'],
+                    'affiliate_id': player_row['affiliate_id'],
+                    'daily_wager': player_row['daily_wager'],
+                    'weekly_wager': player_row['weekly_wager'],
+                    'last_7_days_wager': player_row['last_7_days_wager'],
+                    'monthly_wager': player_row['monthly_wager'],
+                    'all_time_wager': player_row['all_time_wager'],
+                    'total_players': player_row['total_players']
                 })
 
-            return {
+            snapshots.append({
                 'snapshot_date': snapshot_date,
-                'captured_at': rows[0]['captured_at'],
+                'captured_at': row['captured_at'],
                 'players': players
-            }
+            })
 
-        except Exception as e:
-            logger.error(f"Error getting weekly leaderboard snapshot for {snapshot_date}: {e}")
+        return snapshots
+
+    try:
+        return await db_manager.read(run)
+    except Exception as e:
+        logger.error(f"Error getting weekly leaderboard snapshots: {e}")
+        return []
+
+async def get_weekly_leaderboard_snapshot(snapshot_date: str) -> Optional[Dict[str, Any]]:
+    """Get a specific weekly leaderboard snapshot by date."""
+    def run(conn: sqlite3.Connection):
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            SELECT * FROM weekly_leaderboard_snapshots
+            WHERE snapshot_date = ?
+            ORDER BY rank_position
+        ''', (snapshot_date,))
+
+        rows = cursor.fetchall()
+
+        if not rows:
             return None
 
+        players = []
+        for row in rows:
+            players.append({
+                'rank': row['rank_position'],
+                'username': row['username'],
+                'affiliate_id': row['affiliate_id'],
+                'daily_wager': row['daily_wager'],
+                'weekly_wager': row['weekly_wager'],
+                'last_7_days_wager': row['last_7_days_wager'],
+                'monthly_wager': row['monthly_wager'],
+                'all_time_wager': row['all_time_wager'],
+                'total_players': row['total_players']
+            })
+
+        return {
+            'snapshot_date': snapshot_date,
+            'captured_at': rows[0]['captured_at'],
+            'players': players
+        }
+
+    try:
+        return await db_manager.read(run)
+    except Exception as e:
+        logger.error(f"Error getting weekly leaderboard snapshot for {snapshot_date}: {e}")
+        return None
+
 async def check_milestone_achievements(username: str, current_monthly_wager: float) -> List[Dict[str, Any]]:
     """Check if user has achieved any new monthly milestones and record them."""
-    async with db_manager._lock:
-        try:
-            conn = sqlite3.connect(db_manager.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+    def run(conn: sqlite3.Connection):
+        cursor = conn.cursor()
 
-            # Get current month/year
-            from datetime import datetime
-            current_month_year = datetime.now().strftime('%Y-%m')
+        # Get current month/year
+        month_year = current_month_year()
 
-            # Get all milestone definitions
-            cursor.execute('SELECT * FROM milestone_definitions WHERE is_active = 1 ORDER BY milestone_amount')
-            milestones = cursor.fetchall()
+        # Get all milestone definitions (streamed on their own cursor while inserts use `cursor`)
+        milestones = conn.execute('SELECT * FROM milestone_definitions WHERE is_active = 1 ORDER BY milestone_amount')
 
-            # Get already achieved milestones for this user in current month
-            cursor.execute(
-                'SELECT milestone_amount FROM milestone_achievements WHERE username = ? AND month_year = ?',
-                (username, current_month_year)
-            )
-            achieved_milestones = {row['milestone_amount'] for row in cursor.fetchall()}
+        # Get already achieved milestones for this user in current month
+        # (plain tuples: only one column is needed, so skip the Row wrapper)
+        cursor.row_factory = None
+        cursor.execute(
+            'SELECT milestone_amount FROM milestone_achievements WHERE username = ? AND month_year = ?',
+            (username, month_year)
+        )
+        achieved_milestones = {row[0] for row in cursor}
+
+        new_achievements = []
+
+        for milestone in milestones:
+            milestone_amount = milestone['milestone_amount']
+            bonus_amount = milestone['bonus_amount']
+            description = milestone['description']
 
-            new_achievements = []
+            # Check if milestone is achieved and not already recorded for this month
+            if current_monthly_wager >= milestone_amount and milestone_amount not in achieved_milestones:
+                # Record the achievement
+                cursor.execute('''
+                    INSERT INTO milestone_achievements
+                    (username, milestone_amount, bonus_amount, month_year, monthly_wager_at_achievement)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (username, milestone_amount, bonus_amount, month_year, current_monthly_wager))
+
+                new_achievements.append({
+                    'milestone_amount': milestone_amount,
+                    'bonus_amount': bonus_amount,
+                    'description': description,
+                    'monthly_wager': current_monthly_wager,
+                    'month_year': month_year
+                })
 
-            for milestone in milestones:
-                milestone_amount = milestone['milestone_amount']
-                bonus_amount = milestone['bonus_amount']
-                description = milestone['description']
+        # Check for 50k milestones after 100k (every 50k = $50 bonus)
+        if current_monthly_wager >= 100000:
+            # Calculate how many 50k milestones after 100k should be achieved
+            milestones_after_100k = int((current_monthly_wager - 100000) // 50000)
 
-                # Check if milestone is achieved and not already recorded for this month
-                if current_monthly_wager >= milestone_amount and milestone_amount not in achieved_milestones:
-                    # Record the achievement
+            for i in range(1, milestones_after_100k + 1):
+                milestone_amount = 100000 + (i * 50000)  # 150k, 200k, 250k, etc.
+
+                if milestone_amount not in achieved_milestones:
                     cursor.execute('''
                         INSERT INTO milestone_achievements
                         (username, milestone_amount, bonus_amount, month_year, monthly_wager_at_achievement)
                         VALUES (?, ?, ?, ?, ?)
-                    ''', (username, milestone_amount, bonus_amount, current_month_year, current_monthly_wager))
+                    ''', (username, milestone_amount, 50.0, month_year, current_monthly_wager))
 
                     new_achievements.append({
                         'milestone_amount': milestone_amount,
-                        'bonus_amount': bonus_amount,
-                        'description': description,
+                        'bonus_amount': 50.0,
+                        'description': f'$50 bonus for {milestone_amount:,} wagered this month',
                         'monthly_wager': current_monthly_wager,
-                        'month_year': current_month_year
+                        'month_year': month_year
                     })
 
-            # Check for 50k milestones after 100k (every 50k = $50 bonus)
-            if current_monthly_wager >= 100000:
-                # Calculate how many 50k milestones after 100k should be achieved
-                milestones_after_100k = int((current_monthly_wager - 100000) // 50000)
-
-                for i in range(1, milestones_after_100k + 1):
-                    milestone_amount = 100000 + (i * 50000)  # 150k, 200k, 250k, etc.
-
-                    if milestone_amount not in achieved_milestones:
-                        cursor.execute('''
-                            INSERT INTO milestone_achievements
-                            (username, milestone_amount, bonus_amount, month_year, monthly_wager_at_achievement)
-                            VALUES (?, ?, ?, ?, ?)
-                        ''', (username, milestone_amount, 50.0, current_month_year, current_monthly_wager))
-
-                        new_achievements.append({
-                            'milestone_amount': milestone_amount,
-                            'bonus_amount': 50.0,
-                            'description': f'$50 bonus for {milestone_amount:,} wagered this month',
-                            'monthly_wager': current_monthly_wager,
-                            'month_year': current_month_year
-                        })
-
-            conn.commit()
-            conn.close()
+        conn.commit()
 
-            if new_achievements:
-                logger.info(f"User {username} achieved {len(new_achievements)} new monthly milestones for {current_month_year}")
+        if new_achievements:
+            logger.info(f"User {username} achieved {len(new_achievements)} new monthly milestones for {month_year}")
 
-            return new_achievements
+        return new_achievements
 
-        except Exception as e:
-            logger.error(f"Error checking milestone achievements for {username}: {e}")
-            return []
+    try:
+        return await db_manager.write(run)
+    except Exception as e:
+        logger.error(f"Error checking milestone achievements for {username}: {e}")
+        return []
 
 async def get_user_achievements(username: str, month_year: str = None) -> List[Dict[str, Any]]:
     """Get achievements for a user, optionally filtered by month."""
-    async with db_manager._lock:
-        try:
-            conn = sqlite3.connect(db_manager.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+    def run(conn: sqlite3.Connection):
+        cursor = conn.cursor()
+        cursor.row_factory = dict_row_factory
 
-            if month_year:
-                # Get achievements for specific month
-                cursor.execute('''
-                    SELECT ma.*, md.description
-                    FROM milestone_achievements ma
-                    LEFT JOIN milestone_definitions md ON ma.milestone_amount = md.milestone_amount
-                    WHERE ma.username = ? AND ma.month_year = ?
-                    ORDER BY ma.milestone_amount
-                ''', (username, month_year))
-            else:
-                # Get all achievements, ordered by month and milestone
-                cursor.execute('''
-                    SELECT ma.*, md.description
-                    FROM milestone_achievements ma
-                    LEFT JOIN milestone_definitions md ON ma.milestone_amount = md.milestone_amount
-                    WHERE ma.username = ?
-                    ORDER BY ma.month_year DESC, ma.milestone_amount
-                ''', (username,))
-
-            achievements = []
-            for row in cursor.fetchall():
-                achievements.append({
-                    'milestone_amount': row['milestone_amount'],
-                    'bonus_amount': row['bonus_amount'],
-                    'achieved_at': row['achieved_at'],
-                    'month_year': row['month_year'],
-                    'monthly_wager_at_achievement': row['monthly_wager_at_achievement'],
-                    'description': row['description'] or f'${row["bonus_amount"]} bonus for {row["milestone_amount"]:,} wagered',
-                    'notified': bool(row['notified'])
-                })
+        if month_year:
+            # Get achievements for specific month
+            cursor.execute('''
+                SELECT ma.milestone_amount, ma.bonus_amount, ma.achieved_at, ma.month_year,
+                       ma.monthly_wager_at_achievement, md.description, ma.notified
+                FROM milestone_achievements ma
+                LEFT JOIN milestone_definitions md ON ma.milestone_amount = md.milestone_amount
+                WHERE ma.username = ? AND ma.month_year = ?
+                ORDER BY ma.milestone_amount
+            ''', (username, month_year))
+        else:
+            # Get all achievements, ordered by month and milestone
+            cursor.execute('''
+                SELECT ma.milestone_amount, ma.bonus_amount, ma.achieved_at, ma.month_year,
+                       ma.monthly_wager_at_achievement, md.description, ma.notified
+                FROM milestone_achievements ma
+                LEFT JOIN milestone_definitions md ON ma.milestone_amount = md.milestone_amount
+                WHERE ma.username = ?
+                ORDER BY ma.month_year DESC, ma.milestone_amount
+            ''', (username,))
+
+        achievements = cursor.fetchall()
+        # Patch the factory-built dicts in place rather than rebuilding them
+        for row in achievements:
+            if not row['description']:
+                row['description'] = f'${row["bonus_amount"]} bonus for {row["milestone_amount"]:,} wagered'
+            row['notified'] = bool(row['notified'])
+
+        return achievements
 
-            conn.close()
-            return achievements
+    try:
+        return await db_manager.read(run)
+    except Exception as e:
+        logger.error(f"Error getting achievements for {username}: {e}")
+        return []
+
+def _next_milestone(conn: sqlite3.Connection, username: str, current_monthly_wager: float,
+                    month_year: str) -> Optional[Dict[str, Any]]:
+    """Look up the next unachieved milestone for a user on an open connection."""
+    next_milestone = conn.execute(NEXT_MILESTONE_SQL, {
+        'u': username, 'm': month_year, 'w': current_monthly_wager
+    }).fetchone()
+
+    if next_milestone:
+        milestone_amount = next_milestone['milestone_amount']
+        if next_milestone['step_bonus']:
+            description = f'$50 bonus for {milestone_amount:,} wagered this month'
+        else:
+            description = next_milestone['description']
+        return {
+            'milestone_amount': milestone_amount,
+            'bonus_amount': next_milestone['bonus_amount'],
+            'description': description,
+            'progress': current_monthly_wager / milestone_amount,
+            'remaining': milestone_amount - current_monthly_wager
+        }
 
-        except Exception as e:
-            logger.error(f"Error getting achievements for {username}: {e}")
-            return []
+    return None
 
 async def get_next_milestone(username: str, current_monthly_wager: float) -> Optional[Dict[str, Any]]:
     """Get the next milestone for a user in the current month."""
-    async with db_manager._lock:
-        try:
-            conn = sqlite3.connect(db_manager.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+    def run(conn: sqlite3.Connection):
+        return _next_milestone(conn, username, current_monthly_wager, current_month_year())
 
-            # Get current month/year
-            from datetime import datetime
-            current_month_year = datetime.now().strftime('%Y-%m')
+    try:
+        return await db_manager.read(run)
+    except Exception as e:
+        logger.error(f"Error getting next milestone for {username}: {e}")
+        return None
+
+async def get_milestone_progress(username: str, current_monthly_wager: float,
+                                 month_year: str) -> tuple:
+    """Get a month's achievements (with request status) and the next milestone.
+
+    Both queries run in one read transaction on one pooled connection, so they
+    share a single WAL snapshot and the caller makes a single round-trip.
+    """
+    def run(conn: sqlite3.Connection):
+        with conn:
+            conn.execute('BEGIN')
+            cursor = conn.cursor()
+            cursor.row_factory = dict_row_factory
+            cursor.execute(MONTHLY_ACHIEVEMENTS_WITH_REQUESTS_SQL, (username, month_year))
+            achievements = cursor.fetchall()
 
-            # Get achieved milestones for current month
-            cursor.execute(
-                'SELECT milestone_amount FROM milestone_achievements WHERE username = ? AND month_year = ?',
-                (username, current_month_year)
-            )
-            achieved_milestones = {row['milestone_amount'] for row in cursor.fetchall()}
+            return achievements, _next_milestone(conn, username, current_monthly_wager, month_year)
 
-            # Get next standard milestone that hasn't been achieved
-            cursor.execute('''
-                SELECT * FROM milestone_definitions
-                WHERE is_active = 1 AND milestone_amount > ?
-                AND milestone_amount NOT IN (
-                    SELECT milestone_amount FROM milestone_achievements
-                    WHERE username = ? AND month_year = ?
-                )
-                ORDER BY milestone_amount LIMIT 1
-            ''', (current_monthly_wager, username, current_month_year))
-
-            next_milestone = cursor.fetchone()
-
-            # Check for 50k milestones after 100k
-            if current_monthly_wager >= 100000:
-                next_50k_milestone = ((int(current_monthly_wager) // 50000) + 1) * 50000
-                if next_50k_milestone not in achieved_milestones:
-                    if not next_milestone or next_50k_milestone < next_milestone['milestone_amount']:
-                        conn.close()
-                        return {
-                            'milestone_amount': next_50k_milestone,
-                            'bonus_amount': 50.0,
-                            'description': f'$50 bonus for {next_50k_milestone:,} wagered this month',
-                            'progress': current_monthly_wager / next_50k_milestone,
-                            'remaining': next_50k_milestone - current_monthly_wager
-                        }
-
-            if next_milestone:
-                conn.close()
-                return {
-                    'milestone_amount': next_milestone['milestone_amount'],
-                    'bonus_amount': next_milestone['bonus_amount'],
-                    'description': next_milestone['description'],
-                    'progress': current_monthly_wager / next_milestone['milestone_amount'],
-                    'remaining': next_milestone['milestone_amount'] - current_monthly_wager
-                }
-
-            conn.close()
-            return None
-
-        except Exception as e:
-            logger.error(f"Error getting next milestone for {username}: {e}")
-            return None
+    try:
+        return await db_manager.read(run)
+    except Exception as e:
+        logger.error(f"Error getting milestone progress for {username}: {e}")
+        return [], None
 
 async def mark_achievements_notified(username: str, milestone_amounts: List[int]) -> bool:
     """Mark achievements as notified."""
-    async with db_manager._lock:
-        try:
-            conn = sqlite3.connect(db_manager.db_path)
-            cursor = conn.cursor()
-
-            placeholders = ','.join('?' * len(milestone_amounts))
-            cursor.execute(f'''
+    return await mark_many_achievements_notified([(username, amount) for amount in milestone_amounts])
+
+async def mark_many_achievements_notified(pairs: List[tuple]) -> bool:
+    """Mark (username, milestone_amount) achievements as notified in one transaction."""
+    def run(conn: sqlite3.Connection):
+        # Fixed statement shape, so SQLite compiles it once and reuses it per row
+        with conn:
+            conn.executemany('''
                 UPDATE milestone_achievements
                 SET notified = 1
-                WHERE username = ? AND milestone_amount IN ({placeholders})
-            ''', [username] + milestone_amounts)
-
-            conn.commit()
-            conn.close()
-            return True
+                WHERE username = ? AND milestone_amount = ?
+            ''', pairs)
+        return True
 
-        except Exception as e:
-            logger.error(f"Error marking achievements as notified for {username}: {e}")
-            return False
+    try:
+        return await db_manager.write(run)
+    except Exception as e:
+        logger.error(f"Error marking {len(pairs)} achievements as notified: {e}")
+        return False
 
 async def create_milestone_request(username: str, telegram_id: int, milestone_amount: int, bonus_amount: float, month_year: str) -> bool:
     """Create a milestone reward request."""
-    async with db_manager._lock:
-        try:
-            conn = sqlite3.connect(db_manager.db_path)
-            cursor = conn.cursor()
-
-            # Check if request already exists
-            cursor.execute('''
-                SELECT id FROM milestone_requests
-                WHERE username = ? AND milestone_amount = ? AND month_year = ?
-            ''', (username, milestone_amount, month_year))
+    def run(conn: sqlite3.Connection):
+        cursor = conn.cursor()
 
-            if cursor.fetchone():
-                conn.close()
-                return False  # Request already exists
+        # UNIQUE(username, milestone_amount, month_year) makes duplicates a no-op
+        cursor.execute('''
+            INSERT OR IGNORE INTO milestone_requests
+            (username, telegram_id, milestone_amount, bonus_amount, month_year)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (username, telegram_id, milestone_amount, bonus_amount, month_year))
 
-            # Create the request
-            cursor.execute('''
-                INSERT INTO milestone_requests
-                (username, telegram_id, milestone_amount, bonus_amount, month_year)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (username, telegram_id, milestone_amount, bonus_amount, month_year))
+        conn.commit()
 
-            conn.commit()
-            conn.close()
+        if cursor.rowcount == 0:
+            return False  # Request already exists
 
-            logger.info(f"Created milestone request for {username}: ${bonus_amount} for {milestone_amount} ({month_year})")
-            return True
+        logger.info(f"Created milestone request for {username}: ${bonus_amount} for {milestone_amount} ({month_year})")
+        return True
 
-        except Exception as e:
-            logger.error(f"Error creating milestone request for {username}: {e}")
-            return False
+    try:
+        return await db_manager.write(run)
+    except Exception as e:
+        logger.error(f"Error creating milestone request for {username}: {e}")
+        return False
 
 async def get_pending_milestone_requests() -> List[Dict[str, Any]]:
     """Get all pending milestone requests."""
-    async with db_manager._lock:
-        try:
-            conn = sqlite3.connect(db_manager.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+    def run(conn: sqlite3.Connection):
+        cursor = conn.cursor()
+        cursor.row_factory = dict_row_factory
 
-            cursor.execute('''
-                SELECT * FROM milestone_requests
-                WHERE status = 'pending'
-                ORDER BY requested_at ASC
-            ''')
-
-            requests = []
-            for row in cursor.fetchall():
-                requests.append({
-                    'id': row['id'],
-                    'username': row['username'],
-                    'telegram_id': row['telegram_id'],
-                    'milestone_amount': row['milestone_amount'],
-                    'bonus_amount': row['bonus_amount'],
-                    'month_year': row['month_year'],
-                    'requested_at': row['requested_at'],
-                    'status': row['status']
-                })
+        cursor.execute(PENDING_REQUESTS_SQL)
 
-            conn.close()
-            return requests
+        return cursor.fetchall()
 
-        except Exception as e:
-            logger.error(f"Error getting pending milestone requests: {e}")
-            return []
+    try:
+        return await db_manager.read(run)
+    except Exception as e:
+        logger.error(f"Error getting pending milestone requests: {e}")
+        return []
 
 async def get_user_milestone_requests(username: str, month_year: str = None) -> List[Dict[str, Any]]:
     """Get milestone requests for a specific user."""
-    async with db_manager._lock:
-        try:
-            conn = sqlite3.connect(db_manager.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+    def run(conn: sqlite3.Connection):
+        cursor = conn.cursor()
+        cursor.row_factory = dict_row_factory
 
-            if month_year:
-                cursor.execute('''
-                    SELECT * FROM milestone_requests
-                    WHERE username = ? AND month_year = ?
-                    ORDER BY requested_at DESC
-                ''', (username, month_year))
-            else:
-                cursor.execute('''
-                    SELECT * FROM milestone_requests
-                    WHERE username = ?
-                    ORDER BY requested_at DESC
-                ''', (username,))
-
-            requests = []
-            for row in cursor.fetchall():
-                requests.append({
-                    'id': row['id'],
-                    'milestone_amount': row['milestone_amount'],
-                    'bonus_amount': row['bonus_amount'],
-                    'month_year': row['month_year'],
-                    'requested_at': row['requested_at'],
-                    'status': row['status'],
-                    'admin_notes': row['admin_notes'],
-                    'processed_at': row['processed_at']
-                })
+        if month_year:
+            cursor.execute(USER_REQUESTS_FOR_MONTH_SQL, (username, month_year))
+        else:
+            cursor.execute(USER_REQUESTS_SQL, (username,))
 
-            conn.close()
-            return requests
+        return cursor.fetchall()
 
-        except Exception as e:
-            logger.error(f"Error getting milestone requests for {username}: {e}")
-            return []
+    try:
+        return await db_manager.read(run)
+    except Exception as e:
+        logger.error(f"Error getting milestone requests for {username}: {e}")
+        return []
 
-async def update_milestone_request_status(request_id: int, status: str, admin_id: int, admin_notes: str = None) -> bool:
-    """Update the status of a milestone request."""
-    async with db_manager._lock:
-        try:
-            conn = sqlite3.connect(db_manager.db_path)
-            cursor = conn.cursor()
+async def update_milestone_request_status(request_id: int, status: str, admin_id: int,
+                                         admin_notes: str = None) -> Optional[Dict[str, Any]]:
+    """Update the status of a milestone request.
 
+    Returns the request's username and month_year, or None if nothing was updated.
+    """
+    def run(conn: sqlite3.Connection):
+        cursor = conn.cursor()
+        cursor.row_factory = dict_row_factory
+
+        with conn:
             cursor.execute('''
                 UPDATE milestone_requests
                 SET status = ?, processed_by = ?, processed_at = CURRENT_TIMESTAMP, admin_notes = ?
                 WHERE id = ?
+                RETURNING username, month_year
             ''', (status, admin_id, admin_notes, request_id))
+            updated = cursor.fetchone()
 
-            success = cursor.rowcount > 0
-            conn.commit()
-            conn.close()
-
-            if success:
-                logger.info(f"Updated milestone request {request_id} to status: {status}")
+        if updated:
+            logger.info(f"Updated milestone request {request_id} to status: {status}")
 
-            return success
+        return updated
 
-        except Exception as e:
-            logger.error(f"Error updating milestone request {request_id}: {e}")
-            return False
+    try:
+        return await db_manager.write(run)
+    except Exception as e:
+        logger.error(f"Error updating milestone request {request_id}: {e}")
+        return None
+
+# User record plus everything keyed on their username/telegram_id
+UNREGISTER_CLEANUP_SQL = (
+    'DELETE FROM users WHERE telegram_id = :tid',
+    'DELETE FROM milestone_achievements WHERE username = :u',
+    'DELETE FROM milestone_requests WHERE username = :u OR telegram_id = :tid',
+    'DELETE FROM wager_cache WHERE username = :u',
+    'DELETE FROM leaderboard_cache WHERE username = :u',
+    'DELETE FROM rolling_7_day_cache WHERE username = :u',
+)
 
 async def unregister_user(telegram_id: int) -> bool:
     """Unregister a user and clean up their data."""
-    async with db_manager._lock:
-        try:
-            conn = sqlite3.connect(db_manager.db_path)
-            cursor = conn.cursor()
-
+    def run(conn: sqlite3.Connection):
+        # Lookup and cleanup share one transaction: one lock, one commit
+        with conn:
             # Get user info before deletion
-            cursor.execute('SELECT goated_username FROM users WHERE telegram_id = ?', (telegram_id,))
-            user_row = cursor.fetchone()
+            user_row = conn.execute(
+                'SELECT goated_username FROM users WHERE telegram_id = ?', (telegram_id,)
+            ).fetchone()
 
             if not user_row:
-                conn.close()
                 return False  # User not found
 
             username = user_row[0]
+            params = {'tid': telegram_id, 'u': username}
 
-            # Delete user record
-            cursor.execute('DELETE FROM users WHERE telegram_id = ?', (telegram_id,))
-
-            # Clean up related data
-            # Delete milestone achievements
-            cursor.execute('DELETE FROM milestone_achievements WHERE username = ?', (username,))
-
-            # Delete milestone requests
-            cursor.execute('DELETE FROM milestone_requests WHERE username = ? OR telegram_id = ?', (username, telegram_id))
-
-            # Delete cached wager data
-            cursor.execute('DELETE FROM wager_cache WHERE username = ?', (username,))
-
-            # Delete cached leaderboard data
-            cursor.execute('DELETE FROM leaderboard_cache WHERE username = ?', (username,))
+            for sql in UNREGISTER_CLEANUP_SQL:
+                conn.execute(sql, params)
 
             # Update command usage logs to anonymize (if table exists)
             try:
-                cursor.execute('UPDATE command_usage SET telegram_id = 0 WHERE telegram_id = ?', (telegram_id,))
+                conn.execute('UPDATE command_usage SET telegram_id = 0 WHERE telegram_id = :tid', params)
             except sqlite3.OperationalError:
                 # command_usage table doesn't exist, skip
                 pass
 
-            conn.commit()
-            conn.close()
-
-            logger.info(f"Successfully unregistered user {telegram_id} (username: {username})")
-            return True
+        logger.info(f"Successfully unregistered user {telegram_id} (username: {username})")
+        return True
 
-        except Exception as e:
-            logger.error(f"Error unregistering user {telegram_id}: {e}")
-            return False
+    try:
+        return await db_manager.write(run)
+    except Exception as e:
+        logger.error(f"Error unregistering user {telegram_id}: {e}")
+        return False
 
 async def get_user_data_summary(telegram_id: int) -> Optional[Dict[str, Any]]:
     """Get a summary of user's data before unregistering."""
-    async with db_manager._lock:
-        try:
-            conn = sqlite3.connect(db_manager.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-
-            # Get user info
-            cursor.execute('SELECT * FROM users WHERE telegram_id = ?', (telegram_id,))
-            user_row = cursor.fetchone()
-
-            if not user_row:
-                conn.close()
-                return None
-
-            username = user_row['goated_username']
-
-            # Count milestone achievements
-            cursor.execute('SELECT COUNT(*) FROM milestone_achievements WHERE username = ?', (username,))
-            achievement_count = cursor.fetchone()[0]
-
-            # Count milestone requests
-            cursor.execute('SELECT COUNT(*) FROM milestone_requests WHERE username = ?', (username,))
-            request_count = cursor.fetchone()[0]
-
-            # Get total bonus earned
-            cursor.execute('SELECT SUM(bonus_amount) FROM milestone_achievements WHERE username = ?', (username,))
-            total_bonus = cursor.fetchone()[0] or 0
+    def run(conn: sqlite3.Connection):
+        cursor = conn.cursor()
 
-            # Count command usage (if table exists)
-            try:
-                cursor.execute('SELECT COUNT(*) FROM command_usage WHERE telegram_id = ?', (telegram_id,))
-                command_count = cursor.fetchone()[0]
-            except sqlite3.OperationalError:
-                # command_usage table doesn't exist
-                command_count = 0
+        # User row plus achievement/request aggregates in one statement
+        cursor.execute('''
+            SELECT u.*,
+                   (SELECT COUNT(*) FROM milestone_achievements WHERE username = u.goated_username) AS achievement_count,
+                   (SELECT COUNT(*) FROM milestone_requests WHERE username = u.goated_username) AS request_count,
+                   (SELECT COALESCE(SUM(bonus_amount), 0) FROM milestone_achievements WHERE username = u.goated_username) AS total_bonus
+            FROM users u
+            WHERE u.telegram_id = ?
+        ''', (telegram_id,))
+        user_row = cursor.fetchone()
+
+        if not user_row:
+            return None
 
-            conn.close()
+        username = user_row['goated_username']
 
-            return {
-                'username': username,
-                'registered_at': user_row['created_at'],
-                'last_wager_check': user_row['last_wager_check'],
-                'achievement_count': achievement_count,
-                'request_count': request_count,
-                'total_bonus_earned': total_bonus,
-                'command_usage_count': command_count
-            }
+        # Count command usage (if table exists)
+        try:
+            cursor.execute('SELECT COUNT(*) FROM command_usage WHERE telegram_id = ?', (telegram_id,))
+            command_count = cursor.fetchone()[0]
+        except sqlite3.OperationalError:
+            # command_usage table doesn't exist
+            command_count = 0
+
+        return {
+            'username': username,
+            'registered_at': user_row['created_at'],
+            'last_wager_check': user_row['last_wager_check'],
+            'achievement_count': user_row['achievement_count'],
+            'request_count': user_row['request_count'],
+            'total_bonus_earned': user_row['total_bonus'],
+            'command_usage_count': command_count
+        }
 
-        except Exception as e:
-            logger.error(f"Error getting user data summary for {telegram_id}: {e}")
-            return None
+    try:
+        return await db_manager.read(run)
+    except Exception as e:
+        logger.error(f"Error getting user data summary for {telegram_id}: {e}")
+        return None
 
 async def log_command_usage(user_id: int, command: str, success: bool = True, error_message: Optional[str] = None, platform: str = 'telegram') -> bool:
-    """Log command usage for analytics."""
-    try:
-        # Use a shorter timeout and skip if database is busy
-        conn = sqlite3.connect(db_manager.db_path, timeout=2.0)
-        conn.execute('PRAGMA journal_mode=WAL')  # Enable WAL mode for better concurrency
-        cursor = conn.cursor()
+    """Log command usage for analytics.
 
-        # Check if bot_stats table exists
-        cursor.execute("""
-            SELECT name FROM sqlite_master
-            WHERE type='table' AND name='bot_stats'
-        """)
+    Rows are queued and written in batches by the database manager, so this
+    never waits on the database.
+    """
+    try:
+        # Use telegram_id for backward compatibility, but log platform info in command
+        db_manager.log_command((user_id, f"{platform}_{command}", success, error_message))
+        return True
+    except Exception as e:
+        logger.error(f"Error logging command usage: {e}")
+        return False
 
-        if not cursor.fetchone():
-            # Table doesn't exist, skip logging
-            conn.close()
-            return True
+async def record_daily_wager(username: str, daily_wager: float, total_wager: float, date: str = None) -> bool:
+    """Record daily wager amount for a user (date defaults to today, local time)."""
+    def run(conn: sqlite3.Connection):
+        cursor = conn.cursor()
 
-        # Use telegram_id for backward compatibility, but log platform info in command
-        platform_command = f"{platform}_{command}"
         cursor.execute('''
-            INSERT INTO bot_stats (telegram_id, command, success, error_message)
-            VALUES (?, ?, ?, ?)
-        ''', (user_id, platform_command, success, error_message))
+            INSERT OR REPLACE INTO daily_wager_history
+            (username, date, daily_wager, total_wager)
+            VALUES (?, COALESCE(?, date('now', 'localtime')), ?, ?)
+        ''', (username, date, daily_wager, total_wager))
+        cursor.execute(REFRESH_USER_ROLLING_7_DAY_SQL, {'u': username})
 
         conn.commit()
-        conn.close()
 
+        logger.info(f"Recorded daily wager for {username} on {date or 'today'}: ${daily_wager}")
         return True
 
-    except sqlite3.OperationalError as e:
-        if "database is locked" in str(e) or "database is busy" in str(e):
-            # Skip logging if database is locked to avoid blocking operations
-            logger.debug(f"Skipping command usage logging due to database lock")
-            return True  # Return True to not affect command execution
-        else:
-            logger.error(f"Error logging command usage: {e}")
-            return False
+    try:
+        return await db_manager.write(run)
     except Exception as e:
-        logger.error(f"Error logging command usage: {e}")
+        logger.error(f"Error recording daily wager for {username}: {e}")
         return False
 
-async def record_daily_wager(username: str, daily_wager: float, total_wager: float, date: str = None) -> bool:
-    """Record daily wager amount for a user."""
-    if date is None:
-        date = datetime.now().strftime('%Y-%m-%d')
-
-    async with db_manager._lock:
-        try:
-            conn = sqlite3.connect(db_manager.db_path)
-            cursor = conn.cursor()
-
-            cursor.execute('''
+async def record_daily_wagers(rows: List[tuple]) -> bool:
+    """Record a batch of (username, date, daily_wager, total_wager) rows."""
+    def run(conn: sqlite3.Connection):
+        with conn:
+            conn.executemany('''
                 INSERT OR REPLACE INTO daily_wager_history
                 (username, date, daily_wager, total_wager)
                 VALUES (?, ?, ?, ?)
-            ''', (username, date, daily_wager, total_wager))
-
-            conn.commit()
-            conn.close()
+            ''', rows)
+            conn.executemany(REFRESH_USER_ROLLING_7_DAY_SQL,
+                             [{'u': username} for username in {row[0] for row in rows}])
 
-            logger.info(f"Recorded daily wager for {username} on {date}: ${daily_wager}")
-            return True
+        logger.info(f"Recorded {len(rows)} daily wager rows")
+        return True
 
-        except Exception as e:
-            logger.error(f"Error recording daily wager for {username}: {e}")
-            return False
+    try:
+        return await db_manager.write(run)
+    except Exception as e:
+        logger.error(f"Error recording daily wagers: {e}")
+        return False
 
 async def calculate_rolling_7_day_wager(username: str) -> float:
     """Calculate rolling 7-day wager total for a user."""
-    async with db_manager._lock:
-        try:
-            conn = sqlite3.connect(db_manager.db_path)
-            cursor = conn.cursor()
-
-            # Get the last 7 days of data
-            seven_days_ago = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
-            today = datetime.now().strftime('%Y-%m-%d')
-
-            cursor.execute('''
-                SELECT SUM(daily_wager) as total_7_days
-                FROM daily_wager_history
-                WHERE username = ? AND date > ? AND date <= ?
-            ''', (username, seven_days_ago, today))
+    def run(conn: sqlite3.Connection):
+        cursor = conn.cursor()
 
-            result = cursor.fetchone()
-            conn.close()
+        # Today's cached total, kept current by record_daily_wager and maintenance
+        cursor.execute('''
+            SELECT total FROM rolling_7_day_cache
+            WHERE username = ? AND as_of = date('now', 'localtime')
+        ''', (username,))
+        cached = cursor.fetchone()
+        if cached:
+            return float(cached[0])
+
+        # Not cached for today yet: sum the last 7 days of data
+        cursor.execute('''
+            SELECT SUM(daily_wager) as total_7_days
+            FROM daily_wager_history
+            WHERE username = ?
+            AND date > date('now', 'localtime', '-7 days')
+            AND date <= date('now', 'localtime')
+        ''', (username,))
 
-            if result and result[0] is not None:
-                return float(result[0])
-            else:
-                # If no historical data, fall back to today's wager
-                return 0.0
+        result = cursor.fetchone()
 
-        except Exception as e:
-            logger.error(f"Error calculating rolling 7-day wager for {username}: {e}")
+        if result and result[0] is not None:
+            return float(result[0])
+        else:
+            # If no historical data, fall back to today's wager
             return 0.0
 
+    try:
+        return await db_manager.read(run)
+    except Exception as e:
+        logger.error(f"Error calculating rolling 7-day wager for {username}: {e}")
+        return 0.0
+
 async def get_daily_wager_history(username: str, days: int = 7) -> List[Dict[str, Any]]:
     """Get daily wager history for a user."""
-    async with db_manager._lock:
-        try:
-            conn = sqlite3.connect(db_manager.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-
-            start_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
-
-            cursor.execute('''
-                SELECT * FROM daily_wager_history
-                WHERE username = ? AND date > ?
-                ORDER BY date DESC
-            ''', (username, start_date))
+    def run(conn: sqlite3.Connection):
+        cursor = conn.cursor()
+        cursor.row_factory = dict_row_factory
 
-            rows = cursor.fetchall()
-            conn.close()
+        cursor.execute('''
+            SELECT * FROM daily_wager_history
+            WHERE username = ? AND date > date('now', 'localtime', ? || ' days')
+            ORDER BY date DESC
+        ''', (username, -days))
 
-            return [dict(row) for row in rows]
+        return cursor.fetchall()
 
-        except Exception as e:
-            logger.error(f"Error getting daily wager history for {username}: {e}")
-            return []
+    try:
+        return await db_manager.read(run)
+    except Exception as e:
+        logger.error(f"Error getting daily wager history for {username}: {e}")
+        return []
 
 async def cleanup_old_daily_wager_data(days_to_keep: int = 30) -> bool:
     """Clean up old daily wager data to prevent database bloat."""
-    async with db_manager._lock:
-        try:
-            conn = sqlite3.connect(db_manager.db_path)
-            cursor = conn.cursor()
+    def run(conn: sqlite3.Connection):
+        cursor = conn.cursor()
 
-            cutoff_date = (datetime.now() - timedelta(days=days_to_keep)).strftime('%Y-%m-%d')
+        cursor.execute('''
+            DELETE FROM daily_wager_history
+            WHERE date < date('now', 'localtime', ? || ' days')
+        ''', (-days_to_keep,))
 
-            cursor.execute('''
-                DELETE FROM daily_wager_history
-                WHERE date < ?
-            ''', (cutoff_date,))
+        deleted_count = cursor.rowcount
+        conn.commit()
 
-            deleted_count = cursor.rowcount
-            conn.commit()
-            conn.close()
+        if deleted_count > 0:
+            logger.info(f"Cleaned up {deleted_count} old daily wager records")
 
-            if deleted_count > 0:
-                logger.info(f"Cleaned up {deleted_count} old daily wager records")
+        return True
 
-            return True
+    try:
+        return await db_manager.write(run)
+    except Exception as e:
+        logger.error(f"Error cleaning up old daily wager data: {e}")
+        return False
 
-        except Exception as e:
-            logger.error(f"Error cleaning up old daily wager data: {e}")
-            return False
+async def _get_active_users_page(limit: int, after_id: int) -> tuple:
+    """Fetch one page of active users plus the rowid to continue after."""
+    def run(conn: sqlite3.Connection):
+        cursor = conn.cursor()
+        cursor.row_factory = dict_row_factory
+
+        cursor.execute(ACTIVE_USERS_PAGE_SQL, (after_id, limit))
+        rows = cursor.fetchall()
+
+        last_id = rows[-1]['_rowid'] if rows else after_id
+        for row in rows:
+            del row['_rowid']
+        return rows, last_id
+
+    return await db_manager.read(run)
+
+async def get_active_users_page(limit: int = 500, after_id: int = 0) -> List[Dict[str, Any]]:
+    """Get one page of active users, ordered by rowid, starting after after_id."""
+    try:
+        rows, _ = await _get_active_users_page(limit, after_id)
+        return rows
+    except Exception as e:
+        logger.error(f"Error getting active users page: {e}")
+        return []
 
 async def get_all_active_users() -> List[Dict[str, Any]]:
     """Get all active users."""
-    async with db_manager._lock:
-        try:
-            conn = sqlite3.connect(db_manager.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+    return [user async for user in iter_active_users()]
 
-            cursor.execute("SELECT * FROM users WHERE is_active = 1")
-            rows = cursor.fetchall()
-
-            conn.close()
-            return [dict(row) for row in rows]
+async def iter_active_users(batch_size: int = 500) -> AsyncIterator[Dict[str, Any]]:
+    """Yield every active user, fetching batch_size rows per query.
 
+    Raises if a page fails, rather than ending early with a partial list.
+    """
+    after_id = 0
+    while True:
+        try:
+            rows, after_id = await _get_active_users_page(batch_size, after_id)
         except Exception as e:
-            logger.error(f"Error getting all active users: {e}")
-            return []
+            # Re-raise so a failed page can't pass for the end of the table
+            logger.error(f"Error iterating active users: {e}")
+            raise
+
+        for row in rows:
+            yield row
+        if len(rows) < batch_size:
+            return
 
 async def get_user_count() -> int:
     """Get total number of active users."""
-    async with db_manager._lock:
-        try:
-            conn = sqlite3.connect(db_manager.db_path)
-            cursor = conn.cursor()
+    def run(conn: sqlite3.Connection):
+        cursor = conn.cursor()
 
-            cursor.execute("SELECT COUNT(*) FROM users WHERE is_active = 1")
-            count = cursor.fetchone()[0]
+        cursor.execute("SELECT COUNT(*) FROM users WHERE is_active = 1")
+        count = cursor.fetchone()[0]
 
-            conn.close()
-            return count
+        return count
 
-        except Exception as e:
-            logger.error(f"Error getting user count: {e}")
-            return 0
+    try:
+        return await db_manager.read(run)
+    except Exception as e:
+        logger.error(f"Error getting user count: {e}")
+        return 0
 
 # Initialize database on import
 async def init_db():
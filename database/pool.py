@@ -0,0 +1,121 @@
+"""
+SQLite connection pool: one shared read-write connection plus read-only readers.
+"""
+
+import sqlite3
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Optional, List, AsyncIterator
+
+# Per-connection settings applied to every connection the pool opens
+CONNECTION_PRAGMAS = '''
+PRAGMA synchronous=NORMAL;
+PRAGMA temp_store=MEMORY;
+PRAGMA cache_size=-64000;
+PRAGMA mmap_size=268435456;
+PRAGMA busy_timeout=5000;
+'''
+
+# Per-connection prepared statement cache (sqlite3 default is 128)
+CACHED_STATEMENTS = 256
+
+# Seconds close() waits for each checked-out reader to come back
+READER_DRAIN_TIMEOUT = 5.0
+
+logger = logging.getLogger(__name__)
+
+class ConnectionPool:
+    """Single-writer, multi-reader pool over one SQLite database file.
+
+    Writers share one read-write connection behind an asyncio.Lock. Readers
+    check out one of up to ``read_pool_size`` read-only connections and take
+    no lock: in WAL mode each reads a consistent snapshot while the writer
+    keeps committing.
+    """
+
+    def __init__(self, db_path: str, read_pool_size: int):
+        self.db_path = db_path
+        self.read_pool_size = read_pool_size
+        # Serializes writers on the shared connection; readers never take it
+        self._lock = asyncio.Lock()
+        self.conn: Optional[sqlite3.Connection] = None
+        self._readers: asyncio.Queue = asyncio.Queue()
+        self._reader_conns: List[sqlite3.Connection] = []
+        # Readers opened or being opened; counted before the open so the pool never overshoots
+        self._reader_count = 0
+
+    def _open_connection(self, read_only: bool = False) -> sqlite3.Connection:
+        """Open and configure a connection to the database file."""
+        if read_only:
+            uri = Path(self.db_path).resolve().as_uri() + '?mode=ro'
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                                   cached_statements=CACHED_STATEMENTS)
+        else:
+            # Implicit transactions start with BEGIN IMMEDIATE so writers take the
+            # file lock up front and wait on busy_timeout instead of failing mid-way
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level='IMMEDIATE',
+                                   cached_statements=CACHED_STATEMENTS)
+        conn.row_factory = sqlite3.Row
+        conn.executescript(CONNECTION_PRAGMAS)
+        return conn
+
+    def _get_conn(self) -> sqlite3.Connection:
+        """Return the shared read-write connection, opening it on first use."""
+        if self.conn is None:
+            self.conn = self._open_connection()
+        return self.conn
+
+    @asynccontextmanager
+    async def acquire_writer(self) -> AsyncIterator[sqlite3.Connection]:
+        """Yield the shared read-write connection under the write lock."""
+        # asyncio.Lock.acquire() returns without suspending when uncontended
+        async with self._lock:
+            conn = self._get_conn()
+            try:
+                yield conn
+            finally:
+                # Never leave a half-finished transaction on the shared connection
+                if conn.in_transaction:
+                    conn.rollback()
+
+    @asynccontextmanager
+    async def acquire_reader(self) -> AsyncIterator[sqlite3.Connection]:
+        """Yield a read-only connection, opening a new one while the pool is below size."""
+        if self._readers.empty() and self._reader_count < self.read_pool_size:
+            # The writer creates the file before any read-only connection opens it
+            self._get_conn()
+            self._reader_count += 1
+            try:
+                conn = await asyncio.to_thread(self._open_connection, True)
+            except BaseException:
+                self._reader_count -= 1
+                raise
+            self._reader_conns.append(conn)
+        else:
+            conn = await self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put_nowait(conn)
+
+    async def close(self):
+        """Close every connection once in-flight writers and readers are done."""
+        async with self._lock:
+            # Take back every reader so none is closed while a worker thread uses it
+            idle = []
+            for _ in range(self._reader_count):
+                try:
+                    idle.append(await asyncio.wait_for(self._readers.get(), READER_DRAIN_TIMEOUT))
+                except asyncio.TimeoutError:
+                    logger.warning("Closing the pool with read connections still in use")
+                    break
+            for conn in idle:
+                conn.close()
+            self._reader_conns.clear()
+            self._reader_count = 0
+            self._readers = asyncio.Queue()
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
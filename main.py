@@ -4,59 +4,55 @@ Goated Wager Tracker Bot
 A Telegram bot for tracking goated.com affiliate wagers and leaderboard positions.
 """
 
+import asyncio
 import logging
 import os
 import sys
+from types import MappingProxyType
 from dotenv import load_dotenv
-from telegram.ext import Application, CommandHandler
+from telegram.ext import Application
+from utils.event_loop import install_uvloop
+from utils.logging_setup import configure_queue_logging
 
 # Load environment variables
 load_dotenv()
 
+# Environment snapshot taken once at import; startup reads come from here
+_ENV = MappingProxyType(dict(os.environ))
+
 # Import bot modules
-from bot.handlers import (
-    start_handler,
-    register_handler,
-    unregister_handler,
-    confirm_unregister_handler,
-    wager_handler,
-    leaderboard_handler,
-    help_handler,
-    milestones_handler,
-    milestone_info_handler,
-    milestone_callback_handler,
-    pending_requests_handler,
-    approve_request_handler,
-    deny_request_handler,
-    list_users,
-    stats,
-    weekly_leaderboard,
-    capture_leaderboard,
-    error_handler
-)
+from bot.telegram_app_factory import ALLOWED_UPDATES, build_telegram_application
+
 def setup_logging():
     """Set up logging configuration."""
-    log_level = os.getenv('LOG_LEVEL', 'INFO')
-    log_file = os.getenv('LOG_FILE', 'bot.log')
-
-    logging.basicConfig(
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        level=getattr(logging, log_level),
-        handlers=[
-            logging.FileHandler(log_file),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
-
-    # Set up logger for this module
-    logger = logging.getLogger(__name__)
-    return logger
+    # Handlers run on a listener thread; log calls on the event loop only enqueue
+    configure_queue_logging(_ENV.get('LOG_FILE', 'bot.log'))
+    return logging.getLogger(__name__)
+
+async def init_database() -> None:
+    """Create the schema while the read pool warms up."""
+    from database.connection import db_manager
+    await asyncio.gather(db_manager.init_database(), db_manager.warm_readers())
+
+async def post_init(application: Application) -> None:
+    """Start database maintenance once the bot's event loop is running."""
+    from database.connection import db_manager
+    db_manager.start_maintenance()
+
+async def post_shutdown(application: Application) -> None:
+    """Stop the weekly scheduler, flush milestone flags and stop database maintenance, then run a final optimize."""
+    from database.connection import db_manager
+    from utils.milestone_tracker import milestone_tracker
+    from utils.weekly_leaderboard_scheduler import weekly_scheduler
+    await weekly_scheduler.close()
+    await milestone_tracker.close()
+    await db_manager.close()
 
 def main():
     """Main function to start the bot."""
     logger = setup_logging()
 
-    bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
+    bot_token = _ENV.get('TELEGRAM_BOT_TOKEN')
     if not bot_token:
         logger.error("TELEGRAM_BOT_TOKEN not found in environment variables")
         sys.exit(1)
@@ -64,14 +60,11 @@ def main():
     logger.info("🤖 Starting TELEGRAM-ONLY Goated Wager Tracker Bot...")
 
     # Ensure no Discord bot is started
-    if os.getenv('DISCORD_BOT_TOKEN'):
+    if _ENV.get('DISCORD_BOT_TOKEN'):
         logger.warning("Discord token found but this is Telegram-only deployment - ignoring Discord token")
 
     # Initialize database
     try:
-        from database.connection import db_manager
-        import asyncio
-
         # Create new event loop if none exists
         try:
             loop = asyncio.get_event_loop()
@@ -79,43 +72,16 @@ def main():
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
 
-        loop.run_until_complete(db_manager.init_database())
+        loop.run_until_complete(init_database())
         logger.info("Database initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize database: {e}")
         sys.exit(1)
 
-    # Create the Application
-    application = Application.builder().token(bot_token).build()
-
-    # Add command handlers
-    application.add_handler(CommandHandler("start", start_handler))
-    application.add_handler(CommandHandler("register", register_handler))
-    application.add_handler(CommandHandler("unregister", unregister_handler))
-    application.add_handler(CommandHandler("confirm_unregister", confirm_unregister_handler))
-    application.add_handler(CommandHandler("wager", wager_handler))
-    application.add_handler(CommandHandler("leaderboard", leaderboard_handler))
-    application.add_handler(CommandHandler("help", help_handler))
-
-    # Add milestone command handlers
-    application.add_handler(CommandHandler("milestones", milestones_handler))
-    application.add_handler(CommandHandler("milestone_info", milestone_info_handler))
-
-    # Add callback query handler for milestone buttons
-    from telegram.ext import CallbackQueryHandler
-    application.add_handler(CallbackQueryHandler(milestone_callback_handler))
-
-    # Add admin command handlers
-    application.add_handler(CommandHandler("users", list_users))
-    application.add_handler(CommandHandler("stats", stats))
-    application.add_handler(CommandHandler("weekly_leaderboard", weekly_leaderboard))
-    application.add_handler(CommandHandler("capture_leaderboard", capture_leaderboard))
-    application.add_handler(CommandHandler("pending", pending_requests_handler))
-    application.add_handler(CommandHandler("approve", approve_request_handler))
-    application.add_handler(CommandHandler("deny", deny_request_handler))
-
-    # Add error handler
-    application.add_error_handler(error_handler)
+    # Create the Application with all command handlers registered
+    application = build_telegram_application(
+        bot_token, post_init=post_init, post_shutdown=post_shutdown
+    )
 
     # Initialize milestone tracker with bot instance
     try:
@@ -146,7 +112,8 @@ def main():
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
 
-    application.run_polling(allowed_updates=["message", "callback_query"])
+    application.run_polling(allowed_updates=ALLOWED_UPDATES)
 
 if __name__ == '__main__':
+    install_uvloop()
     main()
@@ -6,20 +6,20 @@ Discord-only bot for separate deployment.
 import asyncio
 import logging
 import os
+import signal
 import sys
+from types import MappingProxyType
+from utils.event_loop import install_uvloop
+from utils.logging_setup import configure_queue_logging
+from utils.startup import run_startup_inits
+
+# Environment snapshot taken once at import; startup reads come from here
+_ENV = MappingProxyType(dict(os.environ))
 
 def setup_logging():
     """Set up logging configuration."""
-    log_level = os.getenv('LOG_LEVEL', 'INFO')
-    
-    logging.basicConfig(
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        level=getattr(logging, log_level),
-        handlers=[
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
-    
+    # Handlers run on a listener thread; log calls on the event loop only enqueue
+    configure_queue_logging()
     return logging.getLogger(__name__)
 
 async def main():
@@ -29,50 +29,55 @@ async def main():
     logger.info("🤖 STARTING DISCORD-ONLY BOT")
     
     # Check for Discord token
-    discord_token = os.getenv('DISCORD_BOT_TOKEN')
+    discord_token = _ENV.get('DISCORD_BOT_TOKEN')
     if not discord_token:
         logger.error("❌ No DISCORD_BOT_TOKEN found!")
         sys.exit(1)
     
-    # Initialize database
-    try:
-        from database.connection import db_manager
-        from railway_migrate import ensure_discord_support
-        
-        await db_manager.init_database()
-        await ensure_discord_support()
-        logger.info("✅ Database initialized successfully")
-    except Exception as e:
-        logger.error(f"❌ Failed to initialize database: {e}")
+    # Database and weekly scheduler start concurrently;
+    # only a database failure aborts startup
+    from database.connection import db_manager
+    from utils.weekly_leaderboard_scheduler import weekly_scheduler
+    if not await run_startup_inits():
         sys.exit(1)
 
-    # Initialize milestone tracker
-    try:
-        from utils.milestone_tracker import MilestoneTracker
-        milestone_tracker = MilestoneTracker()
-        logger.info("✅ Milestone tracker initialized")
-    except Exception as e:
-        logger.error(f"❌ Failed to initialize milestone tracker: {e}")
-
-    # Initialize weekly scheduler
-    try:
-        from utils.weekly_leaderboard_scheduler import WeeklyLeaderboardScheduler
-        scheduler = WeeklyLeaderboardScheduler()
-        scheduler.start_scheduler()
-        logger.info("✅ Weekly leaderboard scheduler initialized")
-    except Exception as e:
-        logger.error(f"❌ Failed to initialize weekly scheduler: {e}")
-
     # Import and run Discord bot
     logger.info("🚀 Starting Discord bot...")
+    from bot.discord_handlers import discord_bot
+
+    # SIGINT/SIGTERM (e.g. a Railway redeploy) close the gateway connection
+    # through the finally block below
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            # No loop signal handlers on this platform; Ctrl+C still cancels main()
+            pass
+    bot_task = asyncio.create_task(discord_bot.start(discord_token), name="DiscordBot")
+    stop_waiter = asyncio.create_task(stop_event.wait())
+
     try:
-        from bot.discord_handlers import discord_bot
-        await discord_bot.start(discord_token)
+        await asyncio.wait((bot_task, stop_waiter), return_when=asyncio.FIRST_COMPLETED)
+        if bot_task.done():
+            bot_task.result()
+        else:
+            logger.info("Stopping Discord bot on signal")
     except Exception as e:
         logger.error(f"❌ Discord bot error: {e}")
         raise
+    finally:
+        stop_waiter.cancel()
+        if not discord_bot.is_closed():
+            await discord_bot.close()
+        await asyncio.gather(bot_task, stop_waiter, return_exceptions=True)
+        logger.info("Discord bot stopped")
+        await weekly_scheduler.close()
+        await db_manager.close()
 
 if __name__ == "__main__":
+    install_uvloop()
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
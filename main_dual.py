@@ -6,98 +6,56 @@ Unified main file to run both Telegram and Discord bots.
 import asyncio
 import logging
 import os
+import signal
 import sys
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler
+from types import MappingProxyType
+from utils.event_loop import install_uvloop
+from utils.logging_setup import configure_queue_logging
+from utils.startup import run_startup_inits
 
-# Import Telegram handlers
-from bot.handlers import (
-    start_handler,
-    register_handler,
-    unregister_handler,
-    confirm_unregister_handler,
-    wager_handler,
-    leaderboard_handler,
-    help_handler,
-    milestones_handler,
-    milestone_info_handler,
-    milestone_callback_handler,
-    pending_requests_handler,
-    approve_request_handler,
-    deny_request_handler,
-    list_users,
-    stats,
-    weekly_leaderboard,
-    capture_leaderboard,
-    error_handler
-)
+# Environment snapshot taken once at import; startup reads come from here
+_ENV = MappingProxyType(dict(os.environ))
 
-# Import Discord bot
-from bot.discord_handlers import discord_bot
+logger = logging.getLogger(__name__)
+
+# First three characters of a raw Discord bot token (base64 of the user ID)
+DISCORD_TOKEN_PREFIXES = frozenset(('MTk', 'MTA', 'MTI', 'MTE', 'MTM', 'MTQ', 'MTU', 'MTY', 'MTc', 'MTg'))
 
 def setup_logging():
     """Set up logging configuration."""
-    log_level = os.getenv('LOG_LEVEL', 'INFO')
-    log_file = os.getenv('LOG_FILE', 'bot.log')
-    
-    logging.basicConfig(
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        level=getattr(logging, log_level),
-        handlers=[
-            logging.FileHandler(log_file),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
-    
+    # Handlers run on a listener thread; log calls on the event loop only enqueue
+    configure_queue_logging(_ENV.get('LOG_FILE', 'bot.log'))
     return logging.getLogger(__name__)
 
 async def setup_telegram_bot():
     """Set up and configure the Telegram bot."""
-    bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
+    bot_token = _ENV.get('TELEGRAM_BOT_TOKEN')
     if not bot_token:
         return None
-    
-    # Create the Application
-    application = Application.builder().token(bot_token).build()
-
-    # Add command handlers
-    application.add_handler(CommandHandler("start", start_handler))
-    application.add_handler(CommandHandler("register", register_handler))
-    application.add_handler(CommandHandler("unregister", unregister_handler))
-    application.add_handler(CommandHandler("confirm_unregister", confirm_unregister_handler))
-    application.add_handler(CommandHandler("wager", wager_handler))
-    application.add_handler(CommandHandler("leaderboard", leaderboard_handler))
-    application.add_handler(CommandHandler("help", help_handler))
 
-    # Add milestone command handlers
-    application.add_handler(CommandHandler("milestones", milestones_handler))
-    application.add_handler(CommandHandler("milestone_info", milestone_info_handler))
-    
-    # Add callback query handler for milestone buttons
-    application.add_handler(CallbackQueryHandler(milestone_callback_handler))
+    # Imported here so a Discord-only deployment never loads python-telegram-bot
+    from bot.telegram_app_factory import build_telegram_application
 
-    # Add admin command handlers
-    application.add_handler(CommandHandler("users", list_users))
-    application.add_handler(CommandHandler("stats", stats))
-    application.add_handler(CommandHandler("weekly_leaderboard", weekly_leaderboard))
-    application.add_handler(CommandHandler("capture_leaderboard", capture_leaderboard))
-    application.add_handler(CommandHandler("pending", pending_requests_handler))
-    application.add_handler(CommandHandler("approve", approve_request_handler))
-    application.add_handler(CommandHandler("deny", deny_request_handler))
-
-    # Add error handler
-    application.add_error_handler(error_handler)
+    # Create the Application with all command handlers registered
+    application = build_telegram_application(bot_token)
 
+    # Milestone notifications go out through this application's bot
+    from utils.milestone_tracker import set_milestone_bot
+    set_milestone_bot(application.bot)
     return application
 
 async def setup_discord_bot():
     """Set up and configure the Discord bot."""
-    discord_token = os.getenv('DISCORD_BOT_TOKEN')
+    discord_token = _ENV.get('DISCORD_BOT_TOKEN')
     if not discord_token:
         return None
 
     try:
+        # Imported here so a Telegram-only deployment never loads discord.py
+        from bot.discord_handlers import discord_bot
+
         # Test if the token is valid format
-        if not discord_token.startswith(('Bot ', 'MTk', 'MTA', 'MTI', 'MTE', 'MTM', 'MTQ', 'MTU', 'MTY', 'MTc', 'MTg')):
+        if discord_token[:3] not in DISCORD_TOKEN_PREFIXES and not discord_token.startswith('Bot '):
             logger.warning("Discord token format looks incorrect")
 
         return discord_bot, discord_token
@@ -105,222 +63,112 @@ async def setup_discord_bot():
         logger.error(f"Error setting up Discord bot: {e}")
         return None
 
-def run_both_bots():
-    """Run both Telegram and Discord bots concurrently."""
-    logger = setup_logging()
-
-    logger.info("🚀 STARTING DUAL PLATFORM BOT (main_dual.py)")
-    logger.info("🤖 This will run both Telegram and Discord bots")
-
-    # Initialize database synchronously first
-    try:
-        import asyncio
-        from database.connection import db_manager
-        from railway_migrate import ensure_discord_support
-
-        # Run database initialization
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(db_manager.init_database())
-
-        # Ensure Discord support is added
-        loop.run_until_complete(ensure_discord_support())
-
-        loop.close()
-
-        logger.info("Database initialized successfully")
-    except Exception as e:
-        logger.error(f"Failed to initialize database: {e}")
-        sys.exit(1)
+async def run_telegram_bot(application):
+    """Serve Telegram updates on the running event loop until cancelled.
+
+    Uses a webhook when WEBHOOK_URL is set, long polling otherwise.
+    """
+    from bot.telegram_app_factory import ALLOWED_UPDATES
+
+    await application.initialize()
+    await application.start()
+
+    webhook_url = _ENV.get('WEBHOOK_URL')
+    if webhook_url:
+        # The token as URL path keeps the endpoint unguessable
+        token = application.bot.token
+        await application.updater.start_webhook(
+            listen='0.0.0.0',
+            port=int(_ENV.get('PORT', 8443)),
+            url_path=token,
+            webhook_url=f"{webhook_url.rstrip('/')}/{token}",
+            allowed_updates=ALLOWED_UPDATES,
+        )
+        logger.info("✅ Telegram bot is receiving updates via webhook...")
+    else:
+        await application.updater.start_polling(allowed_updates=ALLOWED_UPDATES)
+        logger.info("✅ Telegram bot is running and waiting for messages...")
 
-    # Initialize milestone tracker
     try:
-        from utils.milestone_tracker import MilestoneTracker
-        milestone_tracker = MilestoneTracker()
-        logger.info("Milestone tracker initialized")
-    except Exception as e:
-        logger.error(f"Failed to initialize milestone tracker: {e}")
+        # Updates are handled in PTB's own tasks; just stay alive until cancelled
+        await asyncio.Event().wait()
+    finally:
+        await application.updater.stop()
+        await application.stop()
+        await application.shutdown()
 
-    # Initialize weekly scheduler
-    try:
-        from utils.weekly_leaderboard_scheduler import WeeklyLeaderboardScheduler
-        scheduler = WeeklyLeaderboardScheduler()
-        scheduler.start_scheduler()
-        logger.info("Weekly leaderboard scheduler initialized")
-    except Exception as e:
-        logger.error(f"Failed to initialize weekly scheduler: {e}")
+async def run_all():
+    """Run the Telegram and/or Discord bots together on one event loop."""
+    logger.info("🚀 STARTING DUAL PLATFORM BOT (main_dual.py)")
+    logger.info("🤖 This will run both Telegram and Discord bots")
 
     # Check which bots to run
-    telegram_token = os.getenv('TELEGRAM_BOT_TOKEN')
-    discord_token = os.getenv('DISCORD_BOT_TOKEN')
+    telegram_token = _ENV.get('TELEGRAM_BOT_TOKEN')
+    discord_token = _ENV.get('DISCORD_BOT_TOKEN')
 
     if not telegram_token and not discord_token:
         logger.error("No bot tokens found! Please set TELEGRAM_BOT_TOKEN and/or DISCORD_BOT_TOKEN")
         sys.exit(1)
 
-    # Run bots based on available tokens
-    if telegram_token and discord_token:
-        logger.info("Running both Telegram and Discord bots...")
-        run_dual_bots(telegram_token, discord_token)
-    elif telegram_token:
-        logger.info("Running Telegram bot only...")
-        run_telegram_only(telegram_token)
-    elif discord_token:
-        logger.info("Running Discord bot only...")
-        run_discord_only(discord_token)
-
-def run_telegram_only(token):
-    """Run only the Telegram bot with proper async handling."""
-    import asyncio
-    from telegram.ext import Application, CommandHandler, CallbackQueryHandler
-    from bot.handlers import (
-        start_handler, register_handler, unregister_handler, confirm_unregister_handler,
-        wager_handler, leaderboard_handler, help_handler, milestones_handler,
-        milestone_info_handler, milestone_callback_handler, pending_requests_handler,
-        approve_request_handler, deny_request_handler, list_users, stats,
-        weekly_leaderboard, capture_leaderboard, error_handler
-    )
-
-    async def run_telegram_async():
-        """Async function to run Telegram bot."""
-        try:
-            application = Application.builder().token(token).build()
-
-            # Add handlers
-            application.add_handler(CommandHandler("start", start_handler))
-            application.add_handler(CommandHandler("register", register_handler))
-            application.add_handler(CommandHandler("unregister", unregister_handler))
-            application.add_handler(CommandHandler("confirm_unregister", confirm_unregister_handler))
-            application.add_handler(CommandHandler("wager", wager_handler))
-            application.add_handler(CommandHandler("leaderboard", leaderboard_handler))
-            application.add_handler(CommandHandler("help", help_handler))
-            application.add_handler(CommandHandler("milestones", milestones_handler))
-            application.add_handler(CommandHandler("milestone_info", milestone_info_handler))
-            application.add_handler(CallbackQueryHandler(milestone_callback_handler))
-            application.add_handler(CommandHandler("users", list_users))
-            application.add_handler(CommandHandler("stats", stats))
-            application.add_handler(CommandHandler("weekly_leaderboard", weekly_leaderboard))
-            application.add_handler(CommandHandler("capture_leaderboard", capture_leaderboard))
-            application.add_handler(CommandHandler("pending", pending_requests_handler))
-            application.add_handler(CommandHandler("approve", approve_request_handler))
-            application.add_handler(CommandHandler("deny", deny_request_handler))
-            application.add_error_handler(error_handler)
-
-            # Initialize and start the application
-            await application.initialize()
-            await application.start()
-
-            # Start polling
-            await application.updater.start_polling(allowed_updates=["message", "callback_query"])
-
-            print("✅ Telegram bot started successfully")
-
-            # Keep running until stopped
-            print("✅ Telegram bot is running and waiting for messages...")
-
-            try:
-                # Keep the bot running indefinitely using a simple sleep loop
-                while True:
-                    await asyncio.sleep(1)
-
-            except KeyboardInterrupt:
-                print("Telegram bot stopped by user")
-            except Exception as e:
-                print(f"Telegram bot error during idle: {e}")
-
-        except Exception as e:
-            print(f"Telegram bot error: {e}")
-        finally:
-            try:
-                await application.stop()
-                await application.shutdown()
-            except:
-                pass
-
-    # Create new event loop for this thread and run the async function
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
+    # Database and weekly scheduler start concurrently;
+    # only a database failure aborts startup
+    from database.connection import db_manager
+    from utils.milestone_tracker import milestone_tracker
+    from utils.weekly_leaderboard_scheduler import weekly_scheduler
+    if not await run_startup_inits():
+        sys.exit(1)
 
-    try:
-        print("🔄 Creating Telegram event loop...")
-        loop.run_until_complete(run_telegram_async())
-    except Exception as e:
-        print(f"❌ Telegram bot thread error: {e}")
-        import traceback
-        traceback.print_exc()
-    finally:
+    # Run bots based on available tokens, all as tasks on this loop
+    tasks = []
+    discord_bot = None
+    if telegram_token:
+        logger.info("Starting Telegram bot...")
+        application = await setup_telegram_bot()
+        tasks.append(asyncio.create_task(run_telegram_bot(application), name="TelegramBot"))
+    if discord_token:
+        logger.info("Starting Discord bot...")
+        discord_setup = await setup_discord_bot()
+        if discord_setup:
+            discord_bot, discord_token = discord_setup
+            tasks.append(asyncio.create_task(discord_bot.start(discord_token), name="DiscordBot"))
+
+    # SIGINT/SIGTERM (e.g. a Railway redeploy) stop the bots through the
+    # finally block below instead of killing them mid-poll
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
         try:
-            loop.close()
-            print("🔄 Telegram event loop closed")
-        except:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            # No loop signal handlers on this platform; Ctrl+C still cancels run_all()
             pass
+    stop_waiter = asyncio.create_task(stop_event.wait())
+    bots = asyncio.gather(*tasks)
 
-def run_discord_only(token):
-    """Run only the Discord bot."""
-    from bot.discord_handlers import discord_bot
-    discord_bot.run(token)
-
-def run_dual_bots(telegram_token, discord_token):
-    """Run both bots using threading with better error handling."""
-    import threading
-    import time
-
-    telegram_running = threading.Event()
-
-    def run_telegram():
-        try:
-            print("🤖 Starting Telegram bot in thread...")
-            run_telegram_only(telegram_token)
-            telegram_running.set()
-        except Exception as e:
-            print(f"❌ Telegram bot thread error: {e}")
-            import traceback
-            traceback.print_exc()
-
-    def run_discord():
-        try:
-            print("🤖 Starting Discord bot in main thread...")
-            run_discord_only(discord_token)
-        except Exception as e:
-            print(f"❌ Discord bot error: {e}")
-            import traceback
-            traceback.print_exc()
-
-    # Start Telegram bot in a separate thread
-    telegram_thread = threading.Thread(target=run_telegram, daemon=False, name="TelegramBot")
-    telegram_thread.start()
-
-    # Give Telegram bot a moment to start
-    print("⏳ Waiting for Telegram bot to initialize...")
-    time.sleep(5)
-
-    # Check if Telegram bot started successfully
-    if telegram_thread.is_alive():
-        print("✅ Telegram bot thread is running")
-    else:
-        print("❌ Telegram bot thread died during startup")
-
-    # Run Discord bot in main thread (this will block)
     try:
-        run_discord_only(discord_token)
-    except KeyboardInterrupt:
-        print("🛑 Shutting down bots...")
-    except Exception as e:
-        print(f"❌ Discord bot crashed: {e}")
-        import traceback
-        traceback.print_exc()
-
-    # Wait for Telegram thread to finish
-    print("⏳ Waiting for Telegram thread to finish...")
-    telegram_thread.join(timeout=10)
-
-    if telegram_thread.is_alive():
-        print("⚠️ Telegram thread still running after timeout")
+        await asyncio.wait((bots, stop_waiter), return_when=asyncio.FIRST_COMPLETED)
+        if bots.done():
+            bots.result()
+        else:
+            logger.info("Stopping bots on signal")
+    finally:
+        # If one bot stops or crashes, take the other down with it
+        stop_waiter.cancel()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(bots, *tasks, return_exceptions=True)
+        if discord_bot is not None and not discord_bot.is_closed():
+            await discord_bot.close()
+        await weekly_scheduler.close()
+        await milestone_tracker.close()
+        await db_manager.close()
 
 def main():
     """Main function to start both bots."""
+    setup_logging()
+    install_uvloop()
     try:
-        run_both_bots()
+        asyncio.run(run_all())
     except KeyboardInterrupt:
         print("Bot stopped by user")
     except Exception as e:
@@ -6,43 +6,23 @@ Telegram-only bot for testing.
 import asyncio
 import logging
 import os
+import signal
 import sys
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler
+from types import MappingProxyType
+from utils.event_loop import install_uvloop
+from utils.logging_setup import configure_queue_logging
+from utils.startup import run_startup_inits
 
-# Import Telegram handlers
-from bot.handlers import (
-    start_handler,
-    register_handler,
-    unregister_handler,
-    confirm_unregister_handler,
-    wager_handler,
-    leaderboard_handler,
-    help_handler,
-    milestones_handler,
-    milestone_info_handler,
-    milestone_callback_handler,
-    pending_requests_handler,
-    approve_request_handler,
-    deny_request_handler,
-    list_users,
-    stats,
-    weekly_leaderboard,
-    capture_leaderboard,
-    error_handler
-)
+# Import Telegram application factory
+from bot.telegram_app_factory import ALLOWED_UPDATES, build_telegram_application
+
+# Environment snapshot taken once at import; startup reads come from here
+_ENV = MappingProxyType(dict(os.environ))
 
 def setup_logging():
     """Set up logging configuration."""
-    log_level = os.getenv('LOG_LEVEL', 'INFO')
-    
-    logging.basicConfig(
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        level=getattr(logging, log_level),
-        handlers=[
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
-    
+    # Handlers run on a listener thread; log calls on the event loop only enqueue
+    configure_queue_logging()
     return logging.getLogger(__name__)
 
 async def main():
@@ -52,72 +32,26 @@ async def main():
     logger.info("🤖 STARTING TELEGRAM-ONLY BOT")
     
     # Check for Telegram token
-    telegram_token = os.getenv('TELEGRAM_BOT_TOKEN')
+    telegram_token = _ENV.get('TELEGRAM_BOT_TOKEN')
     if not telegram_token:
         logger.error("❌ No TELEGRAM_BOT_TOKEN found!")
         sys.exit(1)
     
-    # Initialize database
-    try:
-        from database.connection import db_manager
-        from railway_migrate import ensure_discord_support
-        
-        await db_manager.init_database()
-        await ensure_discord_support()
-        logger.info("✅ Database initialized successfully")
-    except Exception as e:
-        logger.error(f"❌ Failed to initialize database: {e}")
+    # Database and weekly scheduler start concurrently;
+    # only a database failure aborts startup
+    from database.connection import db_manager
+    from utils.milestone_tracker import milestone_tracker
+    from utils.weekly_leaderboard_scheduler import weekly_scheduler
+    if not await run_startup_inits():
         sys.exit(1)
 
-    # Initialize milestone tracker
-    try:
-        from utils.milestone_tracker import MilestoneTracker
-        milestone_tracker = MilestoneTracker()
-        logger.info("✅ Milestone tracker initialized")
-    except Exception as e:
-        logger.error(f"❌ Failed to initialize milestone tracker: {e}")
-
-    # Initialize weekly scheduler
-    try:
-        from utils.weekly_leaderboard_scheduler import WeeklyLeaderboardScheduler
-        scheduler = WeeklyLeaderboardScheduler()
-        scheduler.start_scheduler()
-        logger.info("✅ Weekly leaderboard scheduler initialized")
-    except Exception as e:
-        logger.error(f"❌ Failed to initialize weekly scheduler: {e}")
-
-    # Create the Application
+    # Create the Application with all command handlers registered
     logger.info("🚀 Creating Telegram application...")
-    application = Application.builder().token(telegram_token).build()
-
-    # Add command handlers
-    logger.info("📋 Adding command handlers...")
-    application.add_handler(CommandHandler("start", start_handler))
-    application.add_handler(CommandHandler("register", register_handler))
-    application.add_handler(CommandHandler("unregister", unregister_handler))
-    application.add_handler(CommandHandler("confirm_unregister", confirm_unregister_handler))
-    application.add_handler(CommandHandler("wager", wager_handler))
-    application.add_handler(CommandHandler("leaderboard", leaderboard_handler))
-    application.add_handler(CommandHandler("help", help_handler))
+    application = build_telegram_application(telegram_token)
 
-    # Add milestone command handlers
-    application.add_handler(CommandHandler("milestones", milestones_handler))
-    application.add_handler(CommandHandler("milestone_info", milestone_info_handler))
-    
-    # Add callback query handler for milestone buttons
-    application.add_handler(CallbackQueryHandler(milestone_callback_handler))
-
-    # Add admin command handlers
-    application.add_handler(CommandHandler("users", list_users))
-    application.add_handler(CommandHandler("stats", stats))
-    application.add_handler(CommandHandler("weekly_leaderboard", weekly_leaderboard))
-    application.add_handler(CommandHandler("capture_leaderboard", capture_leaderboard))
-    application.add_handler(CommandHandler("pending", pending_requests_handler))
-    application.add_handler(CommandHandler("approve", approve_request_handler))
-    application.add_handler(CommandHandler("deny", deny_request_handler))
-
-    # Add error handler
-    application.add_error_handler(error_handler)
+    # Milestone notifications go out through this application's bot
+    from utils.milestone_tracker import set_milestone_bot
+    set_milestone_bot(application.bot)
 
     # Run the bot
     logger.info("🚀 Starting Telegram bot...")
@@ -127,28 +61,39 @@ async def main():
         await application.start()
 
         # Start polling
-        await application.updater.start_polling(allowed_updates=["message", "callback_query"])
+        await application.updater.start_polling(allowed_updates=ALLOWED_UPDATES)
 
         logger.info("✅ Telegram bot started successfully and is running...")
 
-        # Keep running until stopped
-        try:
-            while True:
-                await asyncio.sleep(1)
-        except KeyboardInterrupt:
-            logger.info("Telegram bot stopped by user")
+        # Keep running until stopped: park on an event instead of waking every second
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop_event.set)
+            except NotImplementedError:
+                # No loop signal handlers on this platform; Ctrl+C still cancels main()
+                pass
+        await stop_event.wait()
+        logger.info("Telegram bot stopped by signal")
 
     except Exception as e:
         logger.error(f"❌ Telegram bot error: {e}")
         raise
     finally:
         try:
+            if application.updater.running:
+                await application.updater.stop()
             await application.stop()
             await application.shutdown()
-        except:
-            pass
+        except Exception as e:
+            logger.error(f"Error stopping Telegram bot: {e}")
+        await weekly_scheduler.close()
+        await milestone_tracker.close()
+        await db_manager.close()
 
 if __name__ == "__main__":
+    install_uvloop()
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
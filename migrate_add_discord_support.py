@@ -26,81 +26,93 @@ def migrate_add_discord_support():
     # Create backup
     backup_path = f"{db_path}.backup_discord_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
     try:
-        import shutil
-        shutil.copy2(db_path, backup_path)
+        # Online backup API: includes pages still in the WAL file, which a
+        # plain file copy of the main database would miss
+        src = sqlite3.connect(db_path)
+        dst = sqlite3.connect(backup_path)
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+            src.close()
         logger.info(f"Database backup created: {backup_path}")
     except Exception as e:
         logger.error(f"Failed to create backup: {e}")
         return False
     
     try:
-        conn = sqlite3.connect(db_path)
+        # Autocommit mode: the rebuild below manages its own transaction
+        conn = sqlite3.connect(db_path, isolation_level=None)
         cursor = conn.cursor()
+
+        # Bulk-rewrite settings for the table rebuild
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute('PRAGMA temp_store=MEMORY')
+        cursor.execute('PRAGMA cache_size=-200000')
         
         # Check if discord_id column already exists
         cursor.execute("PRAGMA table_info(users)")
-        columns = [column[1] for column in cursor.fetchall()]
         
-        if 'discord_id' in columns:
+        if any(column[1] == 'discord_id' for column in cursor):
             logger.info("Discord support already exists in database")
             conn.close()
             return True
         
         logger.info("Adding Discord support to users table...")
         
-        # Add Discord columns (without UNIQUE constraint initially)
-        cursor.execute('ALTER TABLE users ADD COLUMN discord_id INTEGER')
-        cursor.execute('ALTER TABLE users ADD COLUMN discord_username TEXT')
-        cursor.execute('ALTER TABLE users ADD COLUMN platform TEXT DEFAULT "telegram"')
-        
         # Make telegram_id nullable since Discord users won't have it
         # SQLite doesn't support modifying column constraints directly,
-        # so we'll create a new table and migrate data
+        # so we'll create a new table and migrate data. The Discord columns
+        # come with the new table, so the old one is never ALTERed first.
         
         logger.info("Recreating users table with Discord support...")
         
-        # Create new table with proper structure
-        cursor.execute('''
-            CREATE TABLE users_new (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                telegram_id INTEGER UNIQUE,
-                discord_id INTEGER UNIQUE,
-                telegram_username TEXT,
-                discord_username TEXT,
-                goated_username TEXT UNIQUE NOT NULL,
-                platform TEXT DEFAULT 'telegram',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                is_active BOOLEAN DEFAULT 1,
-                last_wager_check TIMESTAMP,
-                last_leaderboard_check TIMESTAMP
-            )
-        ''')
-        
-        # Copy existing data
-        cursor.execute('''
-            INSERT INTO users_new (
-                telegram_id, telegram_username, goated_username, 
-                platform, created_at, updated_at, is_active, 
-                last_wager_check, last_leaderboard_check
-            )
-            SELECT 
-                telegram_id, telegram_username, goated_username,
-                'telegram', created_at, updated_at, is_active,
-                last_wager_check, last_leaderboard_check
-            FROM users
-        ''')
-        
-        # Drop old table and rename new one
-        cursor.execute('DROP TABLE users')
-        cursor.execute('ALTER TABLE users_new RENAME TO users')
-        
-        # Create indexes
-        cursor.execute('CREATE INDEX idx_users_telegram_id ON users(telegram_id)')
-        cursor.execute('CREATE INDEX idx_users_discord_id ON users(discord_id)')
-        cursor.execute('CREATE INDEX idx_users_platform ON users(platform)')
-        
-        conn.commit()
+        # Rebuild, swap and index in one transaction (one commit, all-or-nothing)
+        with conn:
+            cursor.execute('BEGIN IMMEDIATE')
+
+            # Create new table with proper structure
+            cursor.execute('''
+                CREATE TABLE users_new (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    telegram_id INTEGER UNIQUE,
+                    discord_id INTEGER UNIQUE,
+                    telegram_username TEXT,
+                    discord_username TEXT,
+                    goated_username TEXT UNIQUE NOT NULL,
+                    platform TEXT DEFAULT 'telegram',
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    is_active BOOLEAN DEFAULT 1,
+                    last_wager_check TIMESTAMP,
+                    last_leaderboard_check TIMESTAMP
+                )
+            ''')
+        
+            # Copy existing data
+            cursor.execute('''
+                INSERT INTO users_new (
+                    telegram_id, telegram_username, goated_username, 
+                    platform, created_at, updated_at, is_active, 
+                    last_wager_check, last_leaderboard_check
+                )
+                SELECT 
+                    telegram_id, telegram_username, goated_username,
+                    'telegram', created_at, updated_at, is_active,
+                    last_wager_check, last_leaderboard_check
+                FROM users
+            ''')
+        
+            # Drop old table and rename new one
+            cursor.execute('DROP TABLE users')
+            cursor.execute('ALTER TABLE users_new RENAME TO users')
+        
+            # Create indexes after the copy so they are bulk-built once
+            cursor.execute('CREATE INDEX idx_users_telegram_id ON users(telegram_id)')
+            cursor.execute('CREATE INDEX idx_users_discord_id ON users(discord_id)')
+            cursor.execute('CREATE INDEX idx_users_platform ON users(platform)')
+        
         conn.close()
         
         logger.info("✅ Successfully added Discord support to database!")
@@ -129,12 +141,10 @@ def verify_migration():
             'last_wager_check', 'last_leaderboard_check'
         ]
         
-        actual_columns = [col[1] for col in columns]
-        
-        for expected_col in expected_columns:
-            if expected_col not in actual_columns:
-                logger.error(f"Missing column: {expected_col}")
-                return False
+        missing_columns = set(expected_columns) - {col[1] for col in columns}
+        if missing_columns:
+            logger.error(f"Missing columns: {', '.join(sorted(missing_columns))}")
+            return False
         
         # Check indexes exist
         cursor.execute("PRAGMA index_list(users)")
@@ -6,18 +6,71 @@ This will run automatically when the bot starts.
 
 import sqlite3
 import logging
-import os
 import asyncio
 
 logger = logging.getLogger(__name__)
 
+# Users table with Discord support, plus its lookup indexes
+_USERS_TABLE_DDL = '''
+CREATE TABLE users_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    telegram_id INTEGER UNIQUE,
+    discord_id INTEGER UNIQUE,
+    telegram_username TEXT,
+    discord_username TEXT,
+    goated_username TEXT UNIQUE NOT NULL,
+    platform TEXT DEFAULT 'telegram',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    is_active BOOLEAN DEFAULT 1,
+    last_wager_check TIMESTAMP,
+    last_leaderboard_check TIMESTAMP
+);
+'''
+
+_USERS_INDEXES_DDL = '''
+CREATE INDEX IF NOT EXISTS idx_users_telegram_id ON users(telegram_id);
+CREATE INDEX IF NOT EXISTS idx_users_discord_id ON users(discord_id);
+CREATE INDEX IF NOT EXISTS idx_users_platform ON users(platform);
+'''
+
+# Rebuild an existing Telegram-only users table with Discord support
+DISCORD_MIGRATION_SQL = (
+    'BEGIN IMMEDIATE;'
+    + _USERS_TABLE_DDL
+    + '''
+INSERT INTO users_new (
+    telegram_id, telegram_username, goated_username,
+    platform, created_at, updated_at, is_active,
+    last_wager_check, last_leaderboard_check
+)
+SELECT
+    telegram_id, telegram_username, goated_username,
+    'telegram', created_at, updated_at, is_active,
+    last_wager_check, last_leaderboard_check
+FROM users;
+
+DROP TABLE users;
+ALTER TABLE users_new RENAME TO users;
+'''
+    + _USERS_INDEXES_DDL
+    + 'COMMIT;'
+)
+
+# No users table yet: create it with Discord support from the start
+DISCORD_USERS_TABLE_SQL = (
+    'BEGIN IMMEDIATE;'
+    + _USERS_TABLE_DDL
+    + 'ALTER TABLE users_new RENAME TO users;'
+    + _USERS_INDEXES_DDL
+    + 'COMMIT;'
+)
+
 async def ensure_discord_support():
     """Ensure Discord support is added to the database."""
-    
-    db_path = os.path.join(os.path.dirname(__file__), 'goated_bot.db')
-    
-    try:
-        conn = sqlite3.connect(db_path)
+    from database.connection import db_manager
+
+    def run(conn: sqlite3.Connection):
         cursor = conn.cursor()
         
         # Check if discord_id column exists
@@ -26,66 +79,39 @@ async def ensure_discord_support():
         
         if 'discord_id' not in columns:
             logger.info("Adding Discord support to database...")
-            
-            # Create new table with Discord support
-            cursor.execute('''
-                CREATE TABLE users_new (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    telegram_id INTEGER UNIQUE,
-                    discord_id INTEGER UNIQUE,
-                    telegram_username TEXT,
-                    discord_username TEXT,
-                    goated_username TEXT UNIQUE NOT NULL,
-                    platform TEXT DEFAULT 'telegram',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    is_active BOOLEAN DEFAULT 1,
-                    last_wager_check TIMESTAMP,
-                    last_leaderboard_check TIMESTAMP
-                )
-            ''')
-            
-            # Copy existing data if users table exists
-            try:
-                cursor.execute('''
-                    INSERT INTO users_new (
-                        telegram_id, telegram_username, goated_username, 
-                        platform, created_at, updated_at, is_active, 
-                        last_wager_check, last_leaderboard_check
-                    )
-                    SELECT 
-                        telegram_id, telegram_username, goated_username,
-                        'telegram', created_at, updated_at, is_active,
-                        last_wager_check, last_leaderboard_check
-                    FROM users
-                ''')
-                
-                # Drop old table and rename new one
-                cursor.execute('DROP TABLE users')
-                cursor.execute('ALTER TABLE users_new RENAME TO users')
-                
+
+            # Decide up front whether there are users to copy, so the script
+            # never has to recover from a failed statement mid-transaction
+            has_users_table = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='users'"
+            ).fetchone() is not None
+
+            # Rebuild, copy, swap and index as one script in one transaction
+            cursor.executescript(
+                DISCORD_MIGRATION_SQL if has_users_table else DISCORD_USERS_TABLE_SQL
+            )
+
+            if has_users_table:
                 logger.info("✅ Successfully migrated existing users to new table")
-                
-            except sqlite3.OperationalError:
-                # users table doesn't exist, just rename the new table
-                cursor.execute('ALTER TABLE users_new RENAME TO users')
+            else:
                 logger.info("✅ Created new users table with Discord support")
-            
-            # Create indexes
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_telegram_id ON users(telegram_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_discord_id ON users(discord_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_platform ON users(platform)')
-            
-            conn.commit()
             logger.info("✅ Discord support added successfully")
+            return True
         else:
             logger.info("✅ Discord support already exists")
         
-        conn.close()
+        return False
+
+    try:
+        # Runs on the bot's shared read-write connection rather than a private one
+        migrated = await db_manager.write(run)
+        if migrated:
+            # Give the planner stats for the rebuilt users table and its new indexes
+            await db_manager.optimize()
         return True
         
     except Exception as e:
-        logger.error(f"❌ Failed to ensure Discord support: {e}")
+        logger.error(f"❌ Failed to ensure Discord support: {e}", exc_info=True)
         return False
 
 if __name__ == "__main__":
@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""
+Event loop selection shared by the bot entry points.
+"""
+
+import asyncio
+
+def install_uvloop() -> bool:
+    """Use uvloop's event loop policy when it is available.
+
+    Must run before the entry point creates its loop. Falls back to the
+    default asyncio loop (e.g. on Windows, where uvloop is not installed).
+    """
+    try:
+        import uvloop
+    except ImportError:
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
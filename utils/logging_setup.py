@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Queue-based logging shared by the bot entry points.
+"""
+
+import atexit
+import logging
+import logging.config
+import os
+import queue
+import sys
+from logging.handlers import QueueListener
+from typing import Optional
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+def _resolve_log_level(name: str) -> int:
+    """Map a LOG_LEVEL value to its numeric level, case-insensitively; unknown names mean INFO."""
+    level = logging.getLevelName(name.strip().upper())
+    return level if isinstance(level, int) else logging.INFO
+
+def configure_queue_logging(log_file: Optional[str] = None) -> QueueListener:
+    """Send all log records through a queue drained by a background thread.
+
+    Logging calls on the event loop only enqueue the record; the listener
+    thread does the stdout/file writes.
+    """
+    log_level = _resolve_log_level(os.getenv('LOG_LEVEL', 'INFO'))
+    log_queue = queue.SimpleQueue()
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = []
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
+    handlers.append(logging.StreamHandler(sys.stdout))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    logging.config.dictConfig({
+        'version': 1,
+        'disable_existing_loggers': False,
+        'handlers': {
+            'queue': {
+                'class': 'logging.handlers.QueueHandler',
+                'queue': log_queue,
+            },
+        },
+        'root': {
+            'level': log_level,
+            'handlers': ['queue'],
+        },
+    })
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    # Flush whatever is still queued when the process exits
+    atexit.register(listener.stop)
+    return listener
@@ -3,266 +3,405 @@
 Milestone achievement tracking and notification system.
 """
 
+import asyncio
+import contextlib
+import html
 import logging
-from typing import List, Dict, Any, Optional
-from telegram import Bot
-from telegram.constants import ParseMode
+import time
+from datetime import datetime
+from functools import lru_cache, partial
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional
 
 from database.connection import (
+    current_month_year,
     check_milestone_achievements,
-    get_user_achievements,
     get_next_milestone,
-    mark_achievements_notified,
+    get_milestone_progress,
+    mark_many_achievements_notified,
     get_user,
     create_milestone_request,
-    get_user_milestone_requests,
     get_pending_milestone_requests,
     update_milestone_request_status
 )
 from bot.utils import format_wager_amount
 
+if TYPE_CHECKING:
+    # Annotation only; the Discord-only bot never needs python-telegram-bot loaded
+    from telegram import Bot
+
 logger = logging.getLogger(__name__)
 
+# Admins notified of new reward requests (should match the ones in handlers.py)
+_ADMIN_USER_IDS = (5612012431, 5966207178)
+
+@lru_cache(maxsize=24)
+def _fmt_month(month_year: str) -> str:
+    """Format 'YYYY-MM' as e.g. 'March 2025'."""
+    return datetime.strptime(month_year, '%Y-%m').strftime('%B %Y')
+
+def _current_month() -> tuple:
+    """Return ('YYYY-MM', 'Month YYYY') for now, from the minute-cached month string."""
+    month_year = current_month_year()
+    return month_year, _fmt_month(month_year)
+
+# Achievement notification pieces (HTML, dynamic values escaped), joined once per message
+_ACHIEVEMENT_HEADER = (
+    "🎉 <b>MILESTONE ACHIEVED!</b> 🎉\n\n"
+    "Congratulations {username}! You've reached new wager milestones:\n\n"
+)
+_ACHIEVEMENT_LINE = "🔥 <b>{amount}</b> wagered\n💰 <b>${bonus:.0f} bonus earned!</b>\n\n"
+_ACHIEVEMENT_FOOTER = "Keep up the great work! 🚀\n<i>Use /milestones to see all your achievements</i>"
+
+# Request status -> (button text prefix, callback data prefix); None means not requested yet
+_STATUS_BUTTON = {
+    None: ("Request ", "request_milestone_"),
+    'pending': ("⏳ Pending: ", "pending_milestone_"),
+    'approved': ("✅ Approved: ", "approved_milestone_"),
+}
+
+# Every 10-cell progress bar, indexed by the number of filled cells
+_PROGRESS_BARS = tuple(f"[{'█' * filled}{'░' * (10 - filled)}]" for filled in range(11))
+
+# Admin request notification (HTML); filled in once per request
+_ADMIN_REQUEST_TEMPLATE = (
+    "🔔 <b>NEW MILESTONE REWARD REQUEST</b> 🔔\n\n"
+    "👤 <b>User:</b> {username}\n"
+    "🎯 <b>Milestone:</b> {amount}\n"
+    "💰 <b>Bonus Amount:</b> ${bonus:.0f}\n"
+    "📅 <b>Month:</b> {month}\n\n"
+    "Use <code>/pending_requests</code> to view and manage all requests."
+)
+
+# Milestone definitions; only the month name changes
+_DEFS_HEADER = (
+    "🎯 **Monthly Wager Milestone Rewards** 🎯\n\n"
+    "Earn bonuses for reaching monthly wager milestones in **{month}**:\n\n"
+)
+_DEFS_BODY = (
+    "🔥 **$10** for **10k** wagered this month\n"
+    "🔥 **$15** for **25k** wagered this month\n"
+    "🔥 **$25** for **50k** wagered this month\n"
+    "🔥 **$50** for **100k** wagered this month\n"
+    "🔥 **$50** for every **50k** after 100k this month!\n\n"
+    "📅 **Milestones reset each month**\n"
+    "_Milestones are based on your monthly wager amount_\n"
+    "_Use /wager to check your current progress_"
+)
+
+@lru_cache(maxsize=12)
+def _definitions_for(month_name: str) -> str:
+    """Build the milestone definitions message for one month name."""
+    return _DEFS_HEADER.format(month=month_name) + _DEFS_BODY
+
 class MilestoneTracker:
     """Handles milestone achievement tracking and notifications."""
+
+    # Seconds to collect notified flags from all users before one batched UPDATE
+    NOTIFIED_FLUSH_DELAY = 1.0
+    # Concurrent Telegram sends, kept under the bot API's ~30 messages/second limit
+    MAX_CONCURRENT_SENDS = 25
+    # Seconds a built progress message is reused for repeat /milestones and refresh clicks
+    PROGRESS_CACHE_TTL = 15.0
     
-    def __init__(self, bot: Optional[Bot] = None):
+    def __init__(self, bot: Optional['Bot'] = None):
         self.bot = bot
+        self._notified_pairs: List[tuple] = []
+        self._notified_flush: Optional[asyncio.Task] = None
+        # Set by close() to cut the flush delay short
+        self._closing = asyncio.Event()
+        self._send_sem = asyncio.Semaphore(self.MAX_CONCURRENT_SENDS)
+        # (username, month_year) -> (expires_at, monthly_wager, (message, reply_markup))
+        self._progress_cache: Dict[tuple, tuple] = {}
+        # username -> wager of the next milestone not yet achieved in _threshold_month;
+        # below it a wager check cannot produce new achievements
+        self._next_threshold: Dict[str, float] = {}
+        self._threshold_month = ""
+
+    @property
+    def bot(self) -> Optional['Bot']:
+        """Telegram bot used for notifications, or None to skip sending."""
+        return self._bot
+
+    @bot.setter
+    def bot(self, bot: Optional['Bot']):
+        self._bot = bot
+        # send_message with HTML pre-bound, built once per bot
+        self._send_html: Optional[Callable[..., Awaitable[Any]]] = None
+        if bot is not None:
+            from telegram.constants import ParseMode
+            self._send_html = partial(bot.send_message, parse_mode=ParseMode.HTML)
+
+    def _queue_notified(self, username: str, milestone_amounts: List[int]):
+        """Queue achievements to be marked notified by the next batched flush."""
+        self._notified_pairs.extend((username, amount) for amount in milestone_amounts)
+        if self._notified_flush is None or self._notified_flush.done():
+            self._notified_flush = asyncio.get_running_loop().create_task(self._flush_notified())
+
+    async def _flush_notified(self):
+        """Write queued notified flags until nothing new has arrived."""
+        while True:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._closing.wait(), self.NOTIFIED_FLUSH_DELAY)
+            pairs, self._notified_pairs = self._notified_pairs, []
+            if not pairs:
+                return
+            await mark_many_achievements_notified(pairs)
+
+    async def close(self):
+        """Write any queued notified flags now; call before the database closes."""
+        self._closing.set()
+        if self._notified_flush is not None:
+            await self._notified_flush
+            self._notified_flush = None
+        if self._notified_pairs:
+            pairs, self._notified_pairs = self._notified_pairs, []
+            await mark_many_achievements_notified(pairs)
     
     async def check_and_notify_milestones(self, username: str, current_monthly_wager: float) -> List[Dict[str, Any]]:
         """Check for new monthly milestones and send notifications if bot is available."""
-        try:
-            # Check for new achievements
-            new_achievements = await check_milestone_achievements(username, current_monthly_wager)
-            
-            if new_achievements and self.bot:
-                # Get user's telegram info for notification
-                user_data = await get_user(goated_username=username)
-                if user_data:
-                    telegram_id = user_data.get('telegram_id')
-                    if telegram_id:
-                        await self._send_achievement_notification(telegram_id, username, new_achievements)
-                        
-                        # Mark as notified
-                        milestone_amounts = [achievement['milestone_amount'] for achievement in new_achievements]
-                        await mark_achievements_notified(username, milestone_amounts)
-            
-            return new_achievements
-            
-        except Exception as e:
-            logger.error(f"Error checking milestones for {username}: {e}")
+        # Skip the database while the wager is still short of the next milestone
+        month_year = current_month_year()
+        if month_year != self._threshold_month:
+            self._next_threshold.clear()
+            self._threshold_month = month_year
+        if current_monthly_wager < self._next_threshold.get(username, 0.0):
             return []
+
+        # Check for new achievements
+        new_achievements = await check_milestone_achievements(username, current_monthly_wager)
+
+        # Everything up to this wager is now recorded; remember where the next one starts
+        next_milestone = await get_next_milestone(username, current_monthly_wager)
+        if next_milestone:
+            self._next_threshold[username] = next_milestone['milestone_amount']
+        else:
+            # None may mean a failed lookup: check the database again next time
+            self._next_threshold.pop(username, None)
+        
+        if new_achievements and self.bot:
+            # Get user's telegram info for notification
+            user_data = await get_user(goated_username=username)
+            if user_data:
+                telegram_id = user_data.get('telegram_id')
+                if telegram_id:
+                    await self._send_achievement_notification(telegram_id, username, new_achievements)
+                    
+                    # Mark as notified (batched with other users' notifications)
+                    milestone_amounts = [achievement['milestone_amount'] for achievement in new_achievements]
+                    self._queue_notified(username, milestone_amounts)
+        
+        return new_achievements
     
+    async def _send_telegram(self, chat_id: int, text: str):
+        """Send one HTML message, waiting out a single Telegram flood-control reply."""
+        if self._send_html is None:
+            return
+        from telegram.error import RetryAfter
+
+        async with self._send_sem:
+            try:
+                await self._send_html(chat_id=chat_id, text=text)
+            except RetryAfter as e:
+                await asyncio.sleep(e.retry_after)
+                await self._send_html(chat_id=chat_id, text=text)
+
     async def _send_achievement_notification(self, telegram_id: int, username: str, achievements: List[Dict[str, Any]]):
         """Send achievement notification to user."""
-        try:
-            if not self.bot:
-                return
-            
-            # Create achievement message
-            message = "🎉 **MILESTONE ACHIEVED!** 🎉\n\n"
-            message += f"Congratulations {username}! You've reached new wager milestones:\n\n"
-            
-            total_bonus = 0
-            for achievement in achievements:
-                milestone_amount = achievement['milestone_amount']
-                bonus_amount = achievement['bonus_amount']
-                total_bonus += bonus_amount
-                
-                message += f"🔥 **{format_wager_amount(milestone_amount)}** wagered\n"
-                message += f"💰 **${bonus_amount:.0f} bonus earned!**\n\n"
-            
-            if len(achievements) > 1:
-                message += f"🎊 **Total bonus earned: ${total_bonus:.0f}**\n\n"
-            
-            message += "Keep up the great work! 🚀\n"
-            message += "_Use /milestones to see all your achievements_"
-            
-            await self.bot.send_message(
-                chat_id=telegram_id,
-                text=message,
-                parse_mode=ParseMode.MARKDOWN
+        if not self.bot:
+            return
+        from telegram.error import TelegramError
+
+        # Create achievement message
+        parts = [_ACHIEVEMENT_HEADER.format(username=html.escape(username))]
+        parts.extend(
+            _ACHIEVEMENT_LINE.format(
+                amount=html.escape(format_wager_amount(a['milestone_amount'])), bonus=a['bonus_amount']
             )
-            
-            logger.info(f"Sent milestone notification to user {telegram_id} for {len(achievements)} achievements")
-            
-        except Exception as e:
-            logger.error(f"Error sending achievement notification to {telegram_id}: {e}")
+            for a in achievements
+        )
+        if len(achievements) > 1:
+            total_bonus = sum(a['bonus_amount'] for a in achievements)
+            parts.append(f"🎊 <b>Total bonus earned: ${total_bonus:.0f}</b>\n\n")
+        parts.append(_ACHIEVEMENT_FOOTER)
+        message = "".join(parts)
 
-    async def send_admin_request_notification(self, username: str, milestone_amount: int, bonus_amount: float, month_year: str):
-        """Send notification to admins about a new milestone request."""
         try:
-            if not self.bot:
-                return
-
-            # Admin user IDs (should match the ones in handlers.py)
-            ADMIN_USER_IDS = [5612012431, 5966207178]
+            await self._send_telegram(telegram_id, message)
+        except TelegramError as e:
+            logger.error(f"Error sending achievement notification to {telegram_id}: {e}")
+            return
 
-            from bot.utils import format_wager_amount
-            from datetime import datetime
+        logger.info(f"Sent milestone notification to user {telegram_id} for {len(achievements)} achievements")
 
-            month_name = datetime.strptime(month_year, '%Y-%m').strftime('%B %Y')
+    async def send_admin_request_notification(self, username: str, milestone_amount: int, bonus_amount: float, month_year: str):
+        """Send notification to admins about a new milestone request."""
+        if not self.bot:
+            return
+        from telegram.error import TelegramError
 
-            message = "🔔 **NEW MILESTONE REWARD REQUEST** 🔔\n\n"
-            message += f"👤 **User:** {username}\n"
-            message += f"🎯 **Milestone:** {format_wager_amount(milestone_amount)}\n"
-            message += f"💰 **Bonus Amount:** ${bonus_amount:.0f}\n"
-            message += f"📅 **Month:** {month_name}\n\n"
-            message += "Use `/pending_requests` to view and manage all requests."
+        month_name = _fmt_month(month_year)
 
-            for admin_id in ADMIN_USER_IDS:
-                try:
-                    await self.bot.send_message(
-                        chat_id=admin_id,
-                        text=message,
-                        parse_mode=ParseMode.MARKDOWN
-                    )
-                except Exception as e:
-                    logger.warning(f"Failed to send admin notification to {admin_id}: {e}")
+        message = _ADMIN_REQUEST_TEMPLATE.format(
+            username=html.escape(username),
+            amount=html.escape(format_wager_amount(milestone_amount)),
+            bonus=bonus_amount,
+            month=html.escape(month_name),
+        )
 
-            logger.info(f"Sent milestone request notification to admins for {username}")
+        # Notify all admins at once; one failed DM doesn't stop the others
+        results = await asyncio.gather(
+            *(self._send_telegram(admin_id, message) for admin_id in _ADMIN_USER_IDS),
+            return_exceptions=True
+        )
+        for admin_id, result in zip(_ADMIN_USER_IDS, results):
+            if isinstance(result, TelegramError):
+                logger.warning(f"Failed to send admin notification to {admin_id}: {result}")
+            elif isinstance(result, BaseException):
+                # The request is already recorded; don't fail it over a notification
+                logger.error(f"Unexpected error notifying admin {admin_id}: {result!r}")
 
-        except Exception as e:
-            logger.error(f"Error sending admin request notification: {e}")
+        logger.info(f"Sent milestone request notification to admins for {username}")
 
     async def request_milestone_reward(self, username: str, telegram_id: int, milestone_amount: int, bonus_amount: float, month_year: str) -> bool:
         """Create a milestone reward request and notify admins."""
-        try:
-            # Create the request
-            success = await create_milestone_request(username, telegram_id, milestone_amount, bonus_amount, month_year)
-
-            if success:
-                # Send notification to admins
-                await self.send_admin_request_notification(username, milestone_amount, bonus_amount, month_year)
-                logger.info(f"Created milestone request for {username}: ${bonus_amount} for {milestone_amount}")
-                return True
-            else:
-                logger.warning(f"Failed to create milestone request for {username} - may already exist")
-                return False
+        # Create the request
+        success = await create_milestone_request(username, telegram_id, milestone_amount, bonus_amount, month_year)
 
-        except Exception as e:
-            logger.error(f"Error requesting milestone reward for {username}: {e}")
+        if success:
+            # The user's progress buttons now show the pending request
+            self._progress_cache.pop((username, month_year), None)
+
+            # Send notification to admins
+            await self.send_admin_request_notification(username, milestone_amount, bonus_amount, month_year)
+            logger.info(f"Created milestone request for {username}: ${bonus_amount} for {milestone_amount}")
+            return True
+        else:
+            logger.warning(f"Failed to create milestone request for {username} - may already exist")
             return False
     
+    async def update_request_status(self, request_id: int, status: str, admin_id: int, admin_notes: str) -> bool:
+        """Approve or deny a milestone request and drop the user's cached progress message."""
+        updated = await update_milestone_request_status(request_id, status, admin_id, admin_notes)
+        if not updated:
+            return False
+        # The user's progress buttons now show the new request status
+        self._progress_cache.pop((updated['username'], updated['month_year']), None)
+        return True
+
     async def get_milestone_progress_message(self, username: str, current_monthly_wager: float) -> tuple[str, list]:
         """Get a formatted message showing monthly milestone progress with request buttons."""
-        try:
-            # Get current month/year
-            from datetime import datetime
-            current_month_year = datetime.now().strftime('%Y-%m')
-            current_month_name = datetime.now().strftime('%B %Y')
+        # Get current month/year
+        current_month_year, current_month_name = _current_month()
 
-            # Get user's achievements for current month
-            achievements = await get_user_achievements(username, current_month_year)
-            next_milestone = await get_next_milestone(username, current_monthly_wager)
+        # Reuse a recent message while the wager is unchanged
+        cache_key = (username, current_month_year)
+        now = time.monotonic()
+        cached = self._progress_cache.get(cache_key)
+        if cached and cached[0] > now and cached[1] == current_monthly_wager:
+            return cached[2]
 
-            # Get existing requests for this month
-            existing_requests = await get_user_milestone_requests(username, current_month_year)
-            requested_milestones = {req['milestone_amount']: req['status'] for req in existing_requests}
+        # Get this month's achievements (with any request status) and the next milestone
+        achievements, next_milestone = await get_milestone_progress(
+            username, current_monthly_wager, current_month_year
+        )
+        requested_milestones = {
+            a['milestone_amount']: a['request_status'] for a in achievements if a['request_status']
+        }
 
-            message = f"🏆 **Your Monthly Milestone Progress** 🏆\n"
-            message += f"📅 **{current_month_name}**\n\n"
+        message = f"🏆 **Your Monthly Milestone Progress** 🏆\n"
+        message += f"📅 **{current_month_name}**\n\n"
+        
+        # Show achieved milestones for current month
+        if achievements:
+            total_bonus_earned = sum(a['bonus_amount'] for a in achievements)
+            message += f"✅ **This Month's Achievements:** {len(achievements)}\n"
+            message += f"💰 **Monthly Bonus Earned:** ${total_bonus_earned:.0f}\n\n"
+
+            message += "**Achievements This Month:**\n"
+            message += "".join(
+                f"🔥 {format_wager_amount(a['milestone_amount'])} - ${a['bonus_amount']:.0f}\n"
+                for a in achievements
+            )
+            message += "\n"
+        else:
+            message += "📋 No milestones achieved this month\n\n"
+        
+        # Show next milestone
+        if next_milestone:
+            milestone_amount = next_milestone['milestone_amount']
+            bonus_amount = next_milestone['bonus_amount']
+            remaining = next_milestone['remaining']
+            progress = next_milestone['progress']
             
-            # Show achieved milestones for current month
-            if achievements:
-                total_bonus_earned = sum(a['bonus_amount'] for a in achievements)
-                message += f"✅ **This Month's Achievements:** {len(achievements)}\n"
-                message += f"💰 **Monthly Bonus Earned:** ${total_bonus_earned:.0f}\n\n"
-
-                message += "**Achievements This Month:**\n"
-                for achievement in achievements:
-                    milestone_amount = achievement['milestone_amount']
-                    bonus_amount = achievement['bonus_amount']
-                    message += f"🔥 {format_wager_amount(milestone_amount)} - ${bonus_amount:.0f}\n"
-                message += "\n"
-            else:
-                message += "📋 No milestones achieved this month\n\n"
+            message += "🎯 **Next Milestone:**\n"
+            message += f"Target: {format_wager_amount(milestone_amount)}\n"
+            message += f"Bonus: ${bonus_amount:.0f}\n"
+            message += f"Remaining: {format_wager_amount(remaining)}\n"
             
-            # Show next milestone
-            if next_milestone:
-                milestone_amount = next_milestone['milestone_amount']
-                bonus_amount = next_milestone['bonus_amount']
-                remaining = next_milestone['remaining']
-                progress = next_milestone['progress']
-                
-                message += "🎯 **Next Milestone:**\n"
-                message += f"Target: {format_wager_amount(milestone_amount)}\n"
-                message += f"Bonus: ${bonus_amount:.0f}\n"
-                message += f"Remaining: {format_wager_amount(remaining)}\n"
-                
-                # Progress bar
-                progress_percent = min(progress * 100, 100)
-                progress_bar = self._create_progress_bar(progress_percent)
-                message += f"Progress: {progress_bar} {progress_percent:.1f}%\n"
+            # Progress bar
+            progress_percent = min(progress * 100, 100)
+            progress_bar = self._create_progress_bar(progress_percent)
+            message += f"Progress: {progress_bar} {progress_percent:.1f}%\n"
+        else:
+            message += "🎊 **All monthly milestones achieved!**\n"
+            message += "Keep wagering for $50 bonuses every 50k this month!\n"
+        
+        # Create inline keyboard for requesting rewards
+        from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+        keyboard = []
+
+        # One button per achievement: request it, or show its request status
+        for achievement in achievements:
+            milestone_amount = achievement['milestone_amount']
+            bonus_amount = achievement['bonus_amount']
+
+            status = requested_milestones.get(milestone_amount)
+            button = _STATUS_BUTTON.get(status)
+            if button is None:
+                # e.g. denied requests get no button
+                continue
+            prefix, callback_prefix = button
+
+            button_text = f"{prefix}${bonus_amount:.0f} ({format_wager_amount(milestone_amount)})"
+            if status:
+                callback_data = f"{callback_prefix}{milestone_amount}"
             else:
-                message += "🎊 **All monthly milestones achieved!**\n"
-                message += "Keep wagering for $50 bonuses every 50k this month!\n"
-            
-            # Create inline keyboard for requesting rewards
-            from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-
-            keyboard = []
-
-            # Add request buttons for achieved milestones that haven't been requested
-            for achievement in achievements:
-                milestone_amount = achievement['milestone_amount']
-                bonus_amount = achievement['bonus_amount']
-
-                if milestone_amount not in requested_milestones:
-                    # Not requested yet - show request button
-                    button_text = f"Request ${bonus_amount:.0f} ({format_wager_amount(milestone_amount)})"
-                    callback_data = f"request_milestone_{milestone_amount}_{bonus_amount}_{current_month_year}"
-                    keyboard.append([InlineKeyboardButton(button_text, callback_data=callback_data)])
-                elif requested_milestones[milestone_amount] == 'pending':
-                    # Already requested - show pending status
-                    button_text = f"⏳ Pending: ${bonus_amount:.0f} ({format_wager_amount(milestone_amount)})"
-                    callback_data = f"pending_milestone_{milestone_amount}"
-                    keyboard.append([InlineKeyboardButton(button_text, callback_data=callback_data)])
-                elif requested_milestones[milestone_amount] == 'approved':
-                    # Approved - show status
-                    button_text = f"✅ Approved: ${bonus_amount:.0f} ({format_wager_amount(milestone_amount)})"
-                    callback_data = f"approved_milestone_{milestone_amount}"
-                    keyboard.append([InlineKeyboardButton(button_text, callback_data=callback_data)])
-
-            # Add refresh button
-            keyboard.append([InlineKeyboardButton("🔄 Refresh Progress", callback_data="refresh_milestones")])
-
-            reply_markup = InlineKeyboardMarkup(keyboard) if keyboard else None
-
-            return message, reply_markup
-
-        except Exception as e:
-            logger.error(f"Error getting milestone progress for {username}: {e}")
-            return "❌ Error retrieving milestone progress", None
+                callback_data = f"{callback_prefix}{milestone_amount}_{bonus_amount}_{current_month_year}"
+            keyboard.append([InlineKeyboardButton(button_text, callback_data=callback_data)])
+
+        # Add refresh button
+        keyboard.append([InlineKeyboardButton("🔄 Refresh Progress", callback_data="refresh_milestones")])
+
+        reply_markup = InlineKeyboardMarkup(keyboard) if keyboard else None
+
+        self._cache_progress(cache_key, now, current_monthly_wager, (message, reply_markup))
+        return message, reply_markup
+    
+    def _cache_progress(self, key: tuple, now: float, wager: float, result: tuple):
+        """Store a built progress message, dropping expired entries as the cache grows."""
+        if len(self._progress_cache) >= 1024:
+            self._progress_cache = {
+                k: v for k, v in self._progress_cache.items() if v[0] > now
+            }
+        self._progress_cache[key] = (now + self.PROGRESS_CACHE_TTL, wager, result)
     
     def _create_progress_bar(self, percentage: float, length: int = 10) -> str:
         """Create a visual progress bar."""
         filled = int(length * percentage / 100)
+        if length == 10 and 0 <= filled <= 10:
+            return _PROGRESS_BARS[filled]
         bar = "█" * filled + "░" * (length - filled)
         return f"[{bar}]"
     
     async def get_milestone_definitions(self) -> str:
         """Get formatted milestone definitions."""
-        from datetime import datetime
-        current_month = datetime.now().strftime('%B %Y')
-
-        message = "🎯 **Monthly Wager Milestone Rewards** 🎯\n\n"
-        message += f"Earn bonuses for reaching monthly wager milestones in **{current_month}**:\n\n"
-        message += "🔥 **$10** for **10k** wagered this month\n"
-        message += "🔥 **$15** for **25k** wagered this month\n"
-        message += "🔥 **$25** for **50k** wagered this month\n"
-        message += "🔥 **$50** for **100k** wagered this month\n"
-        message += "🔥 **$50** for every **50k** after 100k this month!\n\n"
-        message += "📅 **Milestones reset each month**\n"
-        message += "_Milestones are based on your monthly wager amount_\n"
-        message += "_Use /wager to check your current progress_"
-
-        return message
+        return _definitions_for(_current_month()[1])
 
 # Global milestone tracker instance
 milestone_tracker = MilestoneTracker()
 
-def set_milestone_bot(bot: Bot):
+def set_milestone_bot(bot: 'Bot'):
     """Set the bot instance for milestone notifications."""
     global milestone_tracker
     milestone_tracker.bot = bot
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Startup steps shared by the async bot entry points.
+"""
+
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+async def _init_database():
+    """Create the schema and run the Discord migration while the read pool warms up."""
+    from database.connection import db_manager
+    await asyncio.gather(db_manager.init_database_then_migrate(), db_manager.warm_readers())
+    db_manager.start_maintenance()
+
+async def _init_scheduler():
+    """Start the weekly leaderboard scheduler on the running loop."""
+    from utils.weekly_leaderboard_scheduler import weekly_scheduler
+    weekly_scheduler.start_scheduler()
+
+# (name, init coroutine, required) - a failed required step aborts startup
+STARTUP_INITS = (
+    ("database", _init_database, True),
+    ("weekly scheduler", _init_scheduler, False),
+)
+
+async def run_startup_inits() -> bool:
+    """Run every startup step concurrently and log each outcome.
+
+    Returns False if a required step failed.
+    """
+    results = await asyncio.gather(
+        *(init() for _, init, _ in STARTUP_INITS), return_exceptions=True
+    )
+
+    ok = True
+    for (name, _, required), result in zip(STARTUP_INITS, results):
+        if isinstance(result, BaseException):
+            logger.error(f"❌ Failed to initialize {name}: {result}")
+            ok = ok and not required
+        else:
+            logger.info(f"✅ {name.capitalize()} initialized")
+    return ok
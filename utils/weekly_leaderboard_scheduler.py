@@ -7,95 +7,144 @@ import asyncio
 import logging
 from datetime import datetime, timedelta
 from typing import Optional
+import aiohttp
 import pytz
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 
 from api.goated_api import GoatedAPI
-from database.connection import store_weekly_leaderboard_snapshot
+from database.connection import (
+    db_manager,
+    get_weekly_leaderboard_snapshot,
+    store_weekly_leaderboard_snapshot
+)
 
 logger = logging.getLogger(__name__)
 
+# Failures a leaderboard fetch can raise: network, timeout, or a malformed response body
+_FETCH_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, ValueError, KeyError)
+
 class WeeklyLeaderboardScheduler:
     """Scheduler for capturing weekly leaderboard snapshots."""
+
+    # Seconds late a capture may still run (e.g. the loop was busy at 19:00)
+    MISFIRE_GRACE_TIME = 3600
+    # A capture missed while the bot was down is taken on startup within this window
+    CATCH_UP_WINDOW = timedelta(hours=24)
     
     def __init__(self):
-        self.scheduler = AsyncIOScheduler()
+        # Jobs are coroutines, so they stay on the default AsyncIOExecutor;
+        # late or piled-up runs collapse into a single capture
+        self.scheduler = AsyncIOScheduler(job_defaults={
+            'coalesce': True,
+            'misfire_grace_time': self.MISFIRE_GRACE_TIME,
+            'max_instances': 1,
+        })
         self.cst_timezone = pytz.timezone('America/Chicago')
+        # One API client (and its HTTP connection pool) reused across captures
+        self._api: Optional[GoatedAPI] = None
+
+    def _get_api(self) -> GoatedAPI:
+        """Return the shared API client, creating it on first use."""
+        if self._api is None:
+            self._api = GoatedAPI()
+        return self._api
         
     async def capture_weekly_leaderboard(self):
         """Capture the top 10 leaderboard players and store them."""
+        logger.info("Starting weekly leaderboard capture...")
+
+        # Get current date in CST for snapshot naming
+        now_cst = datetime.now(self.cst_timezone)
+        snapshot_date = now_cst.strftime('%Y-%m-%d')
+
+        # Fetch top 10 players from API
         try:
-            logger.info("Starting weekly leaderboard capture...")
-            
-            # Get current date in CST for snapshot naming
-            now_cst = datetime.now(self.cst_timezone)
-            snapshot_date = now_cst.strftime('%Y-%m-%d')
-            
-            # Fetch top 10 players from API
-            api = GoatedAPI()
-            try:
-                top_players = await api.get_top_leaderboard_players(limit=10)
-                
-                if not top_players:
-                    logger.warning("No players found for weekly leaderboard capture")
-                    return False
-                
-                # Store the snapshot in database
-                success = await store_weekly_leaderboard_snapshot(snapshot_date, top_players)
-                
-                if success:
-                    logger.info(f"Successfully captured weekly leaderboard snapshot for {snapshot_date} with {len(top_players)} players")
-                    
-                    # Log the top 3 for verification
-                    for i, player in enumerate(top_players[:3], 1):
-                        logger.info(f"  #{i}: {player.get('username', 'Unknown')} - {player.get('last_7_days_wager', 0):,.2f}")
-                    
-                    return True
-                else:
-                    logger.error(f"Failed to store weekly leaderboard snapshot for {snapshot_date}")
-                    return False
-                    
-            finally:
-                await api.close()
-                
-        except Exception as e:
-            logger.error(f"Error during weekly leaderboard capture: {e}")
+            api = self._get_api()
+            top_players = await api.get_top_leaderboard_players(limit=10)
+        except _FETCH_ERRORS as e:
+            logger.error(f"Error fetching leaderboard for weekly capture: {e}")
             return False
-    
+
+        if not top_players:
+            logger.warning("No players found for weekly leaderboard capture")
+            return False
+
+        # Store the snapshot in database (on a worker thread via the write pool)
+        # and build the verification summary while the write is in flight
+        store_task = asyncio.create_task(store_weekly_leaderboard_snapshot(snapshot_date, top_players))
+        top3 = [
+            (player.get('username', 'Unknown'), player.get('last_7_days_wager', 0))
+            for player in top_players[:3]
+        ]
+        success = await store_task
+
+        if success:
+            logger.info(f"Successfully captured weekly leaderboard snapshot for {snapshot_date} with {len(top_players)} players")
+
+            # Log the top 3 for verification
+            for i, (username, wager) in enumerate(top3, 1):
+                logger.info(f"  #{i}: {username} - {wager:,.2f}")
+
+            return True
+        else:
+            logger.error(f"Failed to store weekly leaderboard snapshot for {snapshot_date}")
+            return False
+
     async def manual_capture(self, snapshot_date: Optional[str] = None) -> bool:
         """Manually trigger a leaderboard capture (for testing or missed captures)."""
+        if not snapshot_date:
+            now_cst = datetime.now(self.cst_timezone)
+            snapshot_date = now_cst.strftime('%Y-%m-%d')
+
+        logger.info(f"Manual leaderboard capture for {snapshot_date}")
+
         try:
-            if not snapshot_date:
-                now_cst = datetime.now(self.cst_timezone)
-                snapshot_date = now_cst.strftime('%Y-%m-%d')
-            
-            logger.info(f"Manual leaderboard capture for {snapshot_date}")
-            
-            api = GoatedAPI()
-            try:
-                top_players = await api.get_top_leaderboard_players(limit=10)
-                
-                if not top_players:
-                    logger.warning("No players found for manual leaderboard capture")
-                    return False
-                
-                success = await store_weekly_leaderboard_snapshot(snapshot_date, top_players)
-                
-                if success:
-                    logger.info(f"Successfully captured manual leaderboard snapshot for {snapshot_date}")
-                    return True
-                else:
-                    logger.error(f"Failed to store manual leaderboard snapshot for {snapshot_date}")
-                    return False
-                    
-            finally:
-                await api.close()
-                
-        except Exception as e:
-            logger.error(f"Error during manual leaderboard capture: {e}")
+            api = self._get_api()
+            top_players = await api.get_top_leaderboard_players(limit=10)
+        except _FETCH_ERRORS as e:
+            logger.error(f"Error fetching leaderboard for manual capture: {e}")
             return False
-    
+
+        if not top_players:
+            logger.warning("No players found for manual leaderboard capture")
+            return False
+
+        success = await store_weekly_leaderboard_snapshot(snapshot_date, top_players)
+
+        if success:
+            logger.info(f"Successfully captured manual leaderboard snapshot for {snapshot_date}")
+            return True
+        else:
+            logger.error(f"Failed to store manual leaderboard snapshot for {snapshot_date}")
+            return False
+
+    async def resume_missed_capture(self) -> bool:
+        """Take the most recent Sunday 7 PM CST snapshot if the bot was down for it."""
+        now_cst = datetime.now(self.cst_timezone)
+        last_sunday = (now_cst - timedelta(days=(now_cst.weekday() + 1) % 7)).date()
+        last_run = self.cst_timezone.localize(
+            datetime(last_sunday.year, last_sunday.month, last_sunday.day, 19)
+        )
+        if last_run > now_cst:
+            # Sunday before 7 PM: the last scheduled run was a week ago
+            last_sunday -= timedelta(days=7)
+            last_run = self.cst_timezone.localize(
+                datetime(last_sunday.year, last_sunday.month, last_sunday.day, 19)
+            )
+
+        if now_cst - last_run > self.CATCH_UP_WINDOW:
+            # Too late for the live leaderboard to stand in for that week
+            return False
+
+        snapshot_date = last_run.strftime('%Y-%m-%d')
+        await db_manager.wait_until_ready()
+        if await get_weekly_leaderboard_snapshot(snapshot_date):
+            return False
+
+        logger.info(f"Weekly leaderboard capture for {snapshot_date} was missed, capturing now")
+        return await self.manual_capture(snapshot_date)
+
     def start_scheduler(self):
         """Start the weekly leaderboard capture scheduler."""
         try:
@@ -122,6 +171,15 @@ class WeeklyLeaderboardScheduler:
                 trigger=trigger,
                 id='weekly_leaderboard_capture',
                 name='Weekly Leaderboard Capture',
+                misfire_grace_time=self.MISFIRE_GRACE_TIME,
+                replace_existing=True
+            )
+
+            # One-off run as soon as the scheduler starts
+            self.scheduler.add_job(
+                self.resume_missed_capture,
+                id='resume_missed_capture',
+                name='Resume Missed Leaderboard Capture',
                 replace_existing=True
             )
 
@@ -143,6 +201,13 @@ class WeeklyLeaderboardScheduler:
         except Exception as e:
             logger.error(f"Error stopping weekly leaderboard scheduler: {e}")
     
+    async def close(self):
+        """Stop the scheduler and close the shared API client."""
+        self.stop_scheduler()
+        if self._api is not None:
+            await self._api.close()
+            self._api = None
+    
     def get_next_capture_time(self) -> Optional[datetime]:
         """Get the next scheduled capture time."""
         try:
@@ -161,6 +226,7 @@ async def test_capture():
     """Test function for manual leaderboard capture."""
     scheduler = WeeklyLeaderboardScheduler()
     success = await scheduler.manual_capture()
+    await scheduler.close()
     print(f"Manual capture {'successful' if success else 'failed'}")
 
 if __name__ == "__main__":